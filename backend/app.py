@@ -10,6 +10,25 @@ env_path = backend_dir / '.env'
 load_dotenv(dotenv_path=env_path)
 
 app = Flask(__name__)
+
+# Opt-in request shape capture for load replays (see utils/traffic_capture.py)
+from utils.traffic_capture import init_traffic_capture
+
+init_traffic_capture(app)
+
+# orjson-backed JSON encoding (falls back to the standard library) and
+# gzip/br compression of large responses
+from utils.json_provider import FastJSONProvider
+from utils.compression import init_compression
+
+app.json = FastJSONProvider(app)
+init_compression(app)
+
+# Per-priority concurrency limits and load shedding (see utils/admission.py)
+from utils.admission import init_admission_control
+
+init_admission_control(app)
+
 # Allow CORS from localhost and common network IPs
 CORS(app, origins=[
     "http://localhost:5173", 
@@ -25,16 +44,56 @@ from routes.auth import auth_bp
 from routes.surveys import surveys_bp
 from routes.bookings import bookings_bp
 from routes.webhooks import webhooks_bp
+from routes.promoters import promoters_bp
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(surveys_bp, url_prefix='/api/surveys')
 app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
 app.register_blueprint(webhooks_bp, url_prefix='/api/webhooks')
+app.register_blueprint(promoters_bp, url_prefix='/api/promoters')
 
 @app.route('/api/health', methods=['GET'])
 def health():
     return {'status': 'ok'}, 200
 
+def warm_up():
+    """Import heavy dependencies and create shared clients before the first request.
+
+    Importing this module does no network I/O and creates no clients. Call
+    this from the process manager once a worker has started (e.g. gunicorn's
+    post_worker_init hook), or set BACKEND_WARM_UP=background to run it in
+    a thread while the worker starts serving."""
+    import requests  # noqa: F401 - imported lazily by the Calendly handlers
+    from utils.availability import start_availability_refresher
+    from utils.cache import get_shared_store
+    from utils.log import get_logger
+    from utils.supabase_client import get_supabase_admin
+
+    get_shared_store()
+    start_availability_refresher()
+
+    try:
+        get_supabase_admin()
+    except ValueError as e:
+        get_logger('WARM_UP').warning("Skipping Supabase admin client: %s", e)
+        return
+
+    try:
+        # Without reminders the index is only loaded when the admin endpoint asks
+        from utils.upcoming_sessions import REMINDERS_ENABLED, start_upcoming_sessions
+        if REMINDERS_ENABLED:
+            start_upcoming_sessions()
+    except Exception as e:
+        get_logger('WARM_UP').warning("Upcoming sessions index not loaded: %s", e)
+
+if os.getenv('BACKEND_WARM_UP') == 'background' and __name__ != '__main__':
+    import threading
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
 if __name__ == '__main__':
+    debug = True
+    # With the reloader, only the child process serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up()
     # Run on all interfaces (0.0.0.0) to allow network access
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    app.run(debug=debug, host='0.0.0.0', port=5001)
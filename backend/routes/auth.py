@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
-from utils.supabase_client import get_supabase
-import jwt
+from utils.supabase_client import get_supabase, get_authenticated_user, profile_cache
+from utils.user_lookup import normalize_email, remember_user_email, get_user_id_by_email
+from utils.log import get_logger
+from utils.promoter_stats import record_promoter_event, remember_user_promoter
 import os
 
 auth_bp = Blueprint('auth', __name__)
+register_log = get_logger('REGISTER')
+login_log = get_logger('LOGIN')
+get_user_log = get_logger('GET_USER')
+verify_otp_log = get_logger('VERIFY_OTP')
+verify_email_log = get_logger('VERIFY_EMAIL')
+resend_confirmation_log = get_logger('RESEND_CONFIRMATION')
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -12,7 +20,7 @@ def register():
         return jsonify({'error': 'Request body is required'}), 400
     
     data = request.json
-    email = data.get('email')
+    email = normalize_email(data.get('email'))
     password = data.get('password')
     full_name = data.get('full_name')
     promoter_code = data.get('promoter_code', None)
@@ -51,17 +59,19 @@ def register():
             }).execute()
             
             if not profile_result.data:
-                print(f"[REGISTER WARNING] User profile insert returned no data for user_id: {user_id}")
+                register_log.warning("User profile insert returned no data for user_id: %s", user_id)
+            else:
+                remember_user_email(email, user_id)
+                remember_user_promoter(user_id, promoter_code)
+                record_promoter_event(promoter_code, signups=1)
         except Exception as profile_error:
             # If profile creation fails, log but don't fail registration
             # The user can still confirm email and we can create profile later
-            import traceback
             error_msg = str(profile_error)
-            print(f"[REGISTER WARNING] Failed to create user profile: {error_msg}")
-            print(traceback.format_exc())
+            register_log.warning("Failed to create user profile: %s", error_msg, exc_info=True)
             # If it's a table/permission error, provide helpful message
             if 'permission' in error_msg.lower() or 'policy' in error_msg.lower() or 'does not exist' in error_msg.lower():
-                print(f"[REGISTER WARNING] This might be due to missing 'users' table or RLS policies in Supabase")
+                register_log.warning("This might be due to missing 'users' table or RLS policies in Supabase")
 
         # If we have a session (email confirmation disabled), return tokens
         response_data = {
@@ -78,10 +88,8 @@ def register():
         return jsonify(response_data), 201
 
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"[REGISTER ERROR] {error_msg}")
-        print(traceback.format_exc())
+        register_log.exception("%s", error_msg)
         return jsonify({'error': error_msg}), 400
 
 @auth_bp.route('/login', methods=['POST'])
@@ -109,23 +117,21 @@ def login():
             
             if not profile.data or len(profile.data) == 0:
                 # Profile doesn't exist, create it using admin client
-                print(f"[LOGIN] Creating missing profile for user_id: {user_id}")
+                login_log.info("Creating missing profile for user_id: %s", user_id)
                 from utils.supabase_client import get_supabase_admin
                 admin_supabase = get_supabase_admin()
                 admin_supabase.table('users').insert({
                     'id': user_id,
-                    'email': email,
+                    'email': normalize_email(email),
                     'full_name': email.split('@')[0],  # Use email prefix as default name
                     'survey_completed': False
                 }).execute()
         except Exception as profile_error:
             # Log but don't fail login
-            import traceback
             error_msg = str(profile_error)
-            print(f"[LOGIN WARNING] Profile check/creation failed: {error_msg}")
-            print(traceback.format_exc())
+            login_log.warning("Profile check/creation failed: %s", error_msg, exc_info=True)
             if 'permission' in error_msg.lower() or 'policy' in error_msg.lower() or 'does not exist' in error_msg.lower():
-                print(f"[LOGIN WARNING] This might be due to missing 'users' table or RLS policies in Supabase")
+                login_log.warning("This might be due to missing 'users' table or RLS policies in Supabase")
 
         return jsonify({
             'access_token': response.session.access_token,
@@ -135,10 +141,8 @@ def login():
         }), 200
 
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"[LOGIN ERROR] {error_msg}")
-        print(traceback.format_exc())
+        login_log.exception("%s", error_msg)
         
         # Check if it's an email confirmation error
         if 'email' in error_msg.lower() and 'confirm' in error_msg.lower():
@@ -156,37 +160,49 @@ def get_current_user():
 
     try:
         supabase = get_supabase()
-        user = supabase.auth.get_user(token)
+        user = get_authenticated_user(token)
         
-        if not user or not user.user:
+        if not user:
             return jsonify({'error': 'Invalid token'}), 401
         
-        user_id = user.user.id
-        user_email = user.user.email or 'unknown@example.com'
+        user_id = user.id
+        user_email = user.email or 'unknown@example.com'
+        
+        # Serve the profile from cache when possible (invalidated on survey submit)
+        cached_profile = profile_cache.get(user_id)
+        if cached_profile:
+            return jsonify({
+                'user': {
+                    'id': user_id,
+                    'email': user_email,
+                    'full_name': cached_profile.get('full_name') or user_email.split('@')[0],
+                    'survey_completed': cached_profile.get('survey_completed', False)
+                }
+            }), 200
         
         # Try to get profile
         try:
             profile = supabase.table('users').select('*').eq('id', user_id).execute()
         except Exception as select_error:
             # If select fails, try to create profile
-            print(f"[GET_USER] Select failed, will try to create profile: {str(select_error)}")
+            get_user_log.warning("Select failed, will try to create profile: %s", select_error)
             profile = type('obj', (object,), {'data': []})()  # Create empty profile object
 
         # If profile doesn't exist, create it using admin client
         if not profile.data or len(profile.data) == 0:
-            print(f"[GET_USER] Creating missing profile for user_id: {user_id}")
+            get_user_log.info("Creating missing profile for user_id: %s", user_id)
             try:
                 from utils.supabase_client import get_supabase_admin
                 admin_supabase = get_supabase_admin()
                 # Create profile with default values using admin client to bypass RLS
                 insert_result = admin_supabase.table('users').insert({
                     'id': user_id,
-                    'email': user_email,
+                    'email': normalize_email(user_email),
                     'full_name': user_email.split('@')[0],  # Use email prefix as default
                     'survey_completed': False
                 }).execute()
                 
-                print(f"[GET_USER] Profile created successfully: {insert_result.data}")
+                get_user_log.info("Profile created successfully: %s", insert_result.data)
                 
                 # Fetch the newly created profile
                 profile = supabase.table('users').select('*').eq('id', user_id).execute()
@@ -206,14 +222,12 @@ def get_current_user():
                             }
                         }), 200
             except Exception as create_error:
-                import traceback
                 error_msg = str(create_error)
-                print(f"[GET_USER ERROR] Failed to create profile: {error_msg}")
-                print(traceback.format_exc())
+                get_user_log.exception("Failed to create profile: %s", error_msg)
                 
                 # Return user data even if profile creation fails
                 # This allows the user to continue using the app
-                print(f"[GET_USER] Returning user data without profile due to error")
+                get_user_log.warning("Returning user data without profile due to error")
                 return jsonify({
                     'user': {
                         'id': user_id,
@@ -225,6 +239,10 @@ def get_current_user():
 
         # Return user data with profile
         if profile.data and len(profile.data) > 0:
+            profile_cache.set(user_id, {
+                'full_name': profile.data[0].get('full_name'),
+                'survey_completed': profile.data[0].get('survey_completed', False)
+            })
             return jsonify({
                 'user': {
                     'id': user_id,
@@ -245,10 +263,8 @@ def get_current_user():
             }), 200
 
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"[GET_USER ERROR] {error_msg}")
-        print(traceback.format_exc())
+        get_user_log.exception("%s", error_msg)
         return jsonify({'error': 'Unauthorized', 'details': error_msg}), 401
 
 @auth_bp.route('/verify-email', methods=['POST'])
@@ -286,7 +302,7 @@ def verify_email():
                 }), 200
         except Exception as otp_error:
             # If verify_otp fails, try alternative method
-            print(f"[VERIFY_OTP] {str(otp_error)}")
+            verify_otp_log.info("%s", otp_error)
         
         # Alternative: If the token is from email link, we might need to use exchange_code_for_session
         # But typically Supabase handles this through redirect URLs
@@ -297,10 +313,8 @@ def verify_email():
         }), 400
             
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"[VERIFY_EMAIL ERROR] {error_msg}")
-        print(traceback.format_exc())
+        verify_email_log.exception("%s", error_msg)
         return jsonify({
             'success': False,
             'error': error_msg
@@ -344,21 +358,11 @@ def resend_confirmation():
             
         except Exception as link_error:
             error_msg = str(link_error)
-            print(f"[RESEND_CONFIRMATION] generate_link failed: {error_msg}")
+            resend_confirmation_log.warning("generate_link failed: %s", error_msg)
             
-            # Alternative: Try to find user and resend using their existing data
+            # Alternative: Check whether the user exists via the indexed email lookup
             try:
-                users_response = admin_supabase.auth.admin.list_users()
-                user_found = False
-                for user in users_response.users:
-                    if user.email == email:
-                        user_found = True
-                        # User exists, try to resend
-                        # Unfortunately, Supabase Python client doesn't have a direct resend method
-                        # The email should be sent when generate_link is called
-                        break
-                
-                if not user_found:
+                if not get_user_id_by_email(email):
                     return jsonify({'error': 'User not found. Please register first.'}), 404
                 
                 # If we get here, the user exists but generate_link failed
@@ -368,17 +372,15 @@ def resend_confirmation():
                     'help': 'You can resend the confirmation email from Supabase Dashboard → Authentication → Users → Find your user → Resend confirmation email'
                 }), 400
                 
-            except Exception as list_error:
-                print(f"[RESEND_CONFIRMATION] list_users failed: {str(list_error)}")
+            except Exception as lookup_error:
+                resend_confirmation_log.warning("User lookup failed: %s", lookup_error)
                 return jsonify({
                     'error': 'Unable to resend confirmation email. Please check your Supabase configuration or use the Supabase dashboard.'
                 }), 400
         
     except Exception as e:
-        import traceback
         error_msg = str(e)
-        print(f"[RESEND_CONFIRMATION ERROR] {error_msg}")
-        print(traceback.format_exc())
+        resend_confirmation_log.exception("%s", error_msg)
         return jsonify({
             'error': f'Failed to resend confirmation email: {error_msg}',
             'help': 'Please check your Supabase email service configuration in the dashboard.'
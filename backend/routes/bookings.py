@@ -1,18 +1,38 @@
 from flask import Blueprint, request, jsonify
-from utils.supabase_client import get_supabase
-import requests
+from utils.supabase_client import get_authenticated_user
+from utils.admin_auth import admin_required
+from utils.booking_events import EVENT_CREATED, calendly_invitee_id, record_booking_event, user_bookings_cache
+from utils.cache import TieredCache
+from utils.log import get_logger
 import os
-from datetime import datetime
 
 bookings_bp = Blueprint('bookings', __name__)
+config_log = get_logger('CONFIG')
+calendly_log = get_logger('CALENDLY')
+book_log = get_logger('BOOK')
+bookings_log = get_logger('BOOKINGS')
 
 CALENDLY_API_URL = "https://api.calendly.com/v1"
 CALENDLY_API_KEY = os.getenv("CALENDLY_API_KEY")
 
+# `requests` is imported inside the handlers that call Calendly so it
+# doesn't slow down worker boot.
+
+# Event type UUID -> slug, shared across workers (slugs rarely change)
+EVENT_TYPE_CACHE_TTL_SECONDS = int(os.getenv('EVENT_TYPE_CACHE_TTL_SECONDS', '3600'))
+event_type_cache = TieredCache('calendly_event_types', EVENT_TYPE_CACHE_TTL_SECONDS, max_entries=256)
+
+# Bookings arrive through the Calendly webhook (and scripts/reconcile_bookings.py
+# for backfills), so GET /api/bookings only reads the bookings table. Set
+# BOOKINGS_CALENDLY_SYNC=true to also scan Calendly on every uncached poll,
+# e.g. while the webhook subscription is down.
+BOOKINGS_CALENDLY_SYNC = os.getenv('BOOKINGS_CALENDLY_SYNC', 'false').lower() == 'true'
+
 @bookings_bp.route('/config', methods=['GET'])
 def get_calendly_config():
     """Get Calendly widget configuration (without exposing API key)
     Returns appropriate event type based on whether user has booked intro meeting"""
+    import requests
     try:
         from utils.supabase_client import get_supabase_admin
         admin_supabase = get_supabase_admin()
@@ -34,9 +54,8 @@ def get_calendly_config():
         
         if token:
             try:
-                supabase = get_supabase()
-                user = supabase.auth.get_user(token)
-                user_id = user.user.id
+                user = get_authenticated_user(token)
+                user_id = user.id
                 
                 # Get user's bookings
                 bookings_result = admin_supabase.table('bookings').select('*').eq('user_id', user_id).execute()
@@ -53,7 +72,7 @@ def get_calendly_config():
                     }
                     
                     # Get user's email to check bookings via Calendly API
-                    user_email = user.user.email
+                    user_email = user.email
                     
                     try:
                         # Get scheduled events for this user's email
@@ -81,13 +100,16 @@ def get_calendly_config():
                                     event_type_uuid = event_type_uri.split('/')[-1] if '/' in event_type_uri else None
                                     
                                     if event_type_uuid:
-                                        event_type_response = requests.get(
-                                            f"{CALENDLY_API_URL}/event_types/{event_type_uuid}",
-                                            headers=headers
-                                        )
-                                        if event_type_response.status_code == 200:
-                                            event_type_data = event_type_response.json()
-                                            event_type_slug = event_type_data.get('resource', {}).get('slug', '')
+                                        event_type_slug = event_type_cache.get(event_type_uuid)
+                                        if event_type_slug is None:
+                                            event_type_response = requests.get(
+                                                f"{CALENDLY_API_URL}/event_types/{event_type_uuid}",
+                                                headers=headers
+                                            )
+                                            if event_type_response.status_code == 200:
+                                                event_type_data = event_type_response.json()
+                                                event_type_slug = event_type_data.get('resource', {}).get('slug', '')
+                                                event_type_cache.set(event_type_uuid, event_type_slug)
                                 
                                 # Check if this is the intro meeting and if user is an invitee
                                 if event_type_slug == intro_event_slug:
@@ -118,14 +140,14 @@ def get_calendly_config():
                                 if has_intro_booking:
                                     break
                     except Exception as api_error:
-                        print(f"[CONFIG] Calendly API check failed: {str(api_error)}")
+                        config_log.warning("Calendly API check failed: %s", api_error)
                         # Fallback: if user has any booking, assume intro might be done
                         # But default to showing intro meeting to be safe
                         has_intro_booking = False
                 
             except Exception as e:
                 # If auth fails, just return default (intro meeting)
-                print(f"[CONFIG] Auth check failed: {str(e)}")
+                config_log.info("Auth check failed: %s", e)
                 has_intro_booking = False
         
         # Return appropriate event type
@@ -138,44 +160,35 @@ def get_calendly_config():
             'calendly_event_type': event_type_slug
         }), 200
     except Exception as e:
-        import traceback
-        print(f"[CONFIG ERROR] {str(e)}")
-        print(traceback.format_exc())
+        config_log.exception("%s", e)
         return jsonify({'error': str(e)}), 400
 
 @bookings_bp.route('/availability', methods=['GET'])
 def get_calendly_availability():
-    """Get available meeting slots from Calendly"""
+    """Get available meeting slots from Calendly (served from a refreshed snapshot)"""
+    from utils.availability import AvailabilityError, configured_event_types, get_availability
     try:
         if not CALENDLY_API_KEY:
             return jsonify({'error': 'Calendly API not configured'}), 503
         
-        headers = {
-            'Authorization': f'Bearer {CALENDLY_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Get your Calendly event type UUID (you need to set this)
-        event_type_uuid = os.getenv("CALENDLY_EVENT_TYPE_UUID")
+        # Configure the event type UUIDs with CALENDLY_EVENT_TYPE_UUID (comma-separated)
+        event_types = configured_event_types()
         
-        if not event_type_uuid:
+        if not event_types:
             return jsonify({'error': 'Calendly event type not configured'}), 503
         
-        response = requests.get(
-            f"{CALENDLY_API_URL}/event_types/{event_type_uuid}",
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            return jsonify({'error': 'Failed to fetch Calendly availability'}), response.status_code
+        event_type_uuid = request.args.get('event_type') or event_types[0]
+        if event_type_uuid not in event_types:
+            return jsonify({'error': 'Unknown event type'}), 404
         
-        return jsonify(response.json()), 200
+        return jsonify(get_availability(event_type_uuid)), 200
 
+    except AvailabilityError as e:
+        calendly_log.warning("%s", e)
+        return jsonify({'error': 'Failed to fetch Calendly availability'}), e.status_code
     except Exception as e:
         # Don't expose internal error details
-        import traceback
-        print(f"[CALENDLY ERROR] {str(e)}")
-        print(traceback.format_exc())
+        calendly_log.exception("%s", e)
         return jsonify({'error': 'Failed to fetch availability'}), 400
 
 @bookings_bp.route('/book', methods=['POST'])
@@ -185,12 +198,8 @@ def book_meeting():
     data = request.json
 
     try:
-        from utils.supabase_client import get_supabase_admin
-        admin_supabase = get_supabase_admin()
-        
-        supabase = get_supabase()
-        user = supabase.auth.get_user(token)
-        user_id = user.user.id
+        user = get_authenticated_user(token)
+        user_id = user.id
 
         calendly_event_id = data.get('calendly_event_id')
         scheduled_time = data.get('scheduled_time')
@@ -198,40 +207,30 @@ def book_meeting():
         if not calendly_event_id or not scheduled_time:
             return jsonify({'error': 'Missing calendly_event_id or scheduled_time'}), 400
 
-        # Check if booking already exists
-        existing = admin_supabase.table('bookings').select('*').eq('calendly_event_id', calendly_event_id).execute()
+        # Append to the booking log; the bookings row is updated from it
+        booking, created = record_booking_event(
+            EVENT_CREATED,
+            calendly_event_id,
+            user_id=user_id,
+            scheduled_time=scheduled_time,
+            source='widget'
+        )
         
-        if existing.data and len(existing.data) > 0:
-            # Update existing booking
-            admin_supabase.table('bookings').update({
-                'user_id': user_id,
-                'status': 'confirmed',
-                'scheduled_time': scheduled_time,
-            }).eq('id', existing.data[0]['id']).execute()
-            print(f"[BOOK] ✅ Updated existing booking for user {user_id}")
-            return jsonify({
-                'message': 'Booking updated successfully',
-                'booking_id': existing.data[0]['id']
-            }), 200
-        else:
-            # Create new booking
-            booking = admin_supabase.table('bookings').insert({
-                'user_id': user_id,
-                'calendly_event_id': calendly_event_id,
-                'scheduled_time': scheduled_time,
-                'status': 'confirmed',
-                'created_at': datetime.now().isoformat()
-            }).execute()
-            print(f"[BOOK] ✅ Created new booking for user {user_id}: {scheduled_time}")
+        if created:
+            book_log.info("✅ Created new booking for user %s: %s", user_id, scheduled_time)
             return jsonify({
                 'message': 'Booking created successfully',
-                'booking_id': booking.data[0]['id']
+                'booking_id': booking['id']
             }), 201
+        else:
+            book_log.info("✅ Updated existing booking for user %s", user_id)
+            return jsonify({
+                'message': 'Booking updated successfully',
+                'booking_id': booking['id'] if booking else None
+            }), 200
 
     except Exception as e:
-        import traceback
-        print(f"[BOOK ERROR] {str(e)}")
-        print(traceback.format_exc())
+        book_log.exception("%s", e)
         return jsonify({'error': str(e)}), 400
 
 @bookings_bp.route('', methods=['GET'])
@@ -243,24 +242,30 @@ def get_user_bookings():
         from utils.supabase_client import get_supabase_admin
         admin_supabase = get_supabase_admin()
         
-        supabase = get_supabase()
-        user = supabase.auth.get_user(token)
-        user_id = user.user.id
-        user_email = user.user.email
+        user = get_authenticated_user(token)
+        user_id = user.id
+        user_email = user.email
+
+        # Dashboard polls this endpoint - serve recent results from cache
+        # (invalidated by booking writes, see utils/booking_events.py)
+        cached_bookings = user_bookings_cache.get(user_id)
+        if cached_bookings is not None:
+            return jsonify(cached_bookings), 200
 
         # Get bookings from database
         bookings_result = admin_supabase.table('bookings').select('*').eq('user_id', user_id).order('scheduled_time', desc=False).execute()
         bookings = bookings_result.data or []
 
-        # Also try to fetch from Calendly API and sync to database
-        if CALENDLY_API_KEY and user_email:
+        # Optionally fetch from Calendly API and sync to database
+        if BOOKINGS_CALENDLY_SYNC and CALENDLY_API_KEY and user_email:
+            import requests
             try:
                 headers = {
                     'Authorization': f'Bearer {CALENDLY_API_KEY}',
                     'Content-Type': 'application/json'
                 }
                 
-                print(f"[BOOKINGS] 🔍 Syncing bookings from Calendly API for email: {user_email}")
+                bookings_log.debug("🔍 Syncing bookings from Calendly API for email: %s", user_email)
                 
                 # Get all scheduled events (without user filter - we'll filter by invitee email)
                 # This approach works even if /users/me endpoint is not available
@@ -273,17 +278,18 @@ def get_user_bookings():
                     }
                 )
                 
-                print(f"[BOOKINGS] Calendly API response status: {events_response.status_code}")
+                bookings_log.debug("Calendly API response status: %s", events_response.status_code)
                 
                 if events_response.status_code == 401:
-                    print(f"[BOOKINGS] ⚠️ Calendly API authentication failed - check CALENDLY_API_KEY")
+                    bookings_log.warning("⚠️ Calendly API authentication failed - check CALENDLY_API_KEY")
                     # Don't raise - just log and continue with database bookings
                 elif events_response.status_code == 404:
-                    print(f"[BOOKINGS] ⚠️ Calendly API endpoint not found (404) - API key may lack permissions or endpoint structure changed")
+                    bookings_log.warning("⚠️ Calendly API endpoint not found (404) - API key may lack permissions or endpoint structure changed")
                     # Don't raise - just log and continue with database bookings
                 elif events_response.status_code == 200:
                     events_data = events_response.json()
                     scheduled_events = events_data.get('collection', [])
+                    known_event_ids = {booking.get('calendly_event_id') for booking in bookings}
                     
                     # For each scheduled event, get the invitees and match by email
                     for scheduled_event in scheduled_events:
@@ -309,43 +315,56 @@ def get_user_bookings():
                                 
                                 if invitee_email == user_email.lower():
                                     # Found matching invitee - extract booking info
-                                    invitee_uri = invitee.get('uri', '')
-                                    calendly_event_id = invitee_uri.split('/')[-1] if invitee_uri and '/' in invitee_uri else invitee.get('uuid') or None
+                                    calendly_event_id = calendly_invitee_id(invitee)
                                     scheduled_time = scheduled_event.get('start_time')
                                     
                                     if scheduled_time and calendly_event_id:
-                                        # Check if booking already exists
-                                        existing = admin_supabase.table('bookings').select('*').eq('user_id', user_id).eq('calendly_event_id', calendly_event_id).execute()
-                                        
-                                        if not existing.data or len(existing.data) == 0:
-                                            # Create new booking
-                                            admin_supabase.table('bookings').insert({
-                                                'user_id': user_id,
-                                                'calendly_event_id': calendly_event_id,
-                                                'scheduled_time': scheduled_time,
-                                                'status': 'confirmed',
-                                                'created_at': datetime.now().isoformat()
-                                            }).execute()
-                                            print(f"[BOOKINGS] ✅ Synced new booking from Calendly for user {user_id}: {scheduled_time}")
+                                        if calendly_event_id not in known_event_ids:
+                                            # New booking - append to the booking log
+                                            record_booking_event(
+                                                EVENT_CREATED,
+                                                calendly_event_id,
+                                                user_id=user_id,
+                                                scheduled_time=scheduled_time,
+                                                source='calendly_sync'
+                                            )
+                                            known_event_ids.add(calendly_event_id)
+                                            bookings_log.info("✅ Synced new booking from Calendly for user %s: %s", user_id, scheduled_time)
                                         break  # Found matching invitee, move to next event
                     
                     # Refresh bookings from database after sync
                     bookings_result = admin_supabase.table('bookings').select('*').eq('user_id', user_id).order('scheduled_time', desc=False).execute()
                     bookings = bookings_result.data or []
-                    print(f"[BOOKINGS] ✅ Total bookings after sync: {len(bookings)}")
+                    bookings_log.debug("✅ Total bookings after sync: %s", len(bookings))
                 else:
-                    print(f"[BOOKINGS] ⚠️ Calendly API returned status {events_response.status_code}: {events_response.text[:200]}")
+                    bookings_log.warning("⚠️ Calendly API returned status %s: %s", events_response.status_code, events_response.text[:200])
                             
             except Exception as cal_error:
                 # If Calendly API fails, just use database bookings
-                import traceback
-                print(f"[BOOKINGS] Calendly API error (non-critical): {str(cal_error)}")
-                print(traceback.format_exc())
+                bookings_log.warning("Calendly API error (non-critical): %s", cal_error, exc_info=True)
 
+        user_bookings_cache.set(user_id, bookings)
         return jsonify(bookings), 200
 
     except Exception as e:
-        import traceback
-        print(f"[BOOKINGS ERROR] {str(e)}")
-        print(traceback.format_exc())
+        bookings_log.exception("%s", e)
+        return jsonify({'error': str(e)}), 400
+
+@bookings_bp.route('/upcoming', methods=['GET'])
+@admin_required
+def get_upcoming_sessions():
+    """Get confirmed sessions starting in the next `hours` hours (default 24)"""
+    try:
+        hours = float(request.args.get('hours', 24))
+        limit = request.args.get('limit', type=int)
+        if hours <= 0:
+            return jsonify({'error': 'hours must be positive'}), 400
+
+        from utils.upcoming_sessions import get_upcoming_sessions_index
+        sessions = get_upcoming_sessions_index().next_hours(hours, limit=limit)
+        return jsonify({'hours': hours, 'count': len(sessions), 'sessions': sessions}), 200
+    except ValueError:
+        return jsonify({'error': 'hours must be a number'}), 400
+    except Exception as e:
+        bookings_log.exception("%s", e)
         return jsonify({'error': str(e)}), 400
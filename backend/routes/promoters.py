@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from utils.admin_auth import admin_required
+from utils.promoter_stats import get_promoter_stats, list_promoter_stats
+from utils.log import get_logger
+
+promoters_bp = Blueprint('promoters', __name__)
+promoter_log = get_logger('PROMOTER')
+
+@promoters_bp.route('/stats', methods=['GET'])
+@admin_required
+def get_all_promoter_stats():
+    """Get signup, survey and booking counters for every promoter code"""
+    try:
+        return jsonify(list_promoter_stats()), 200
+    except Exception as e:
+        promoter_log.exception("%s", e)
+        return jsonify({'error': str(e)}), 400
+
+@promoters_bp.route('/<promoter_code>/stats', methods=['GET'])
+@admin_required
+def get_single_promoter_stats(promoter_code):
+    """Get signup, survey and booking counters for one promoter code"""
+    try:
+        return jsonify(get_promoter_stats(promoter_code)), 200
+    except Exception as e:
+        promoter_log.exception("%s", e)
+        return jsonify({'error': str(e)}), 400
+
+@promoters_bp.route('/register/bulk', methods=['POST'])
+@admin_required
+def register_bulk():
+    """Register a cohort of users in chunks (admin only)"""
+    data = request.get_json(silent=True) or {}
+    users = data.get('users') if isinstance(data, dict) else None
+
+    if not isinstance(users, list) or not users:
+        return jsonify({'error': 'users must be a non-empty list'}), 400
+
+    try:
+        from utils.bulk_registration import register_users_bulk
+        results = register_users_bulk(users)
+        failed = sum(1 for result in results if result.get('error'))
+        return jsonify({
+            'created': len(results) - failed,
+            'failed': failed,
+            'results': results
+        }), 200
+    except Exception as e:
+        promoter_log.exception("%s", e)
+        return jsonify({'error': str(e)}), 400
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from utils.supabase_client import get_supabase
+from utils.supabase_client import get_supabase, get_authenticated_user, profile_cache
+from utils.log import get_logger
+from utils.promoter_stats import record_promoter_event
 
 surveys_bp = Blueprint('surveys', __name__)
+survey_log = get_logger('SURVEY')
 
 @surveys_bp.route('/submit', methods=['POST'])
 def submit_survey():
@@ -11,8 +14,8 @@ def submit_survey():
 
     try:
         supabase = get_supabase()
-        user = supabase.auth.get_user(token)
-        user_id = user.user.id
+        user = get_authenticated_user(token)
+        user_id = user.id
 
         # Store survey responses
         supabase.table('surveys').insert({
@@ -23,17 +26,19 @@ def submit_survey():
             'additional_notes': data.get('additional_notes')
         }).execute()
 
-        # Mark survey as completed
-        supabase.table('users').update({
+        # Mark survey as completed (only matches on the first completion)
+        completed = supabase.table('users').update({
             'survey_completed': True
-        }).eq('id', user_id).execute()
+        }).eq('id', user_id).eq('survey_completed', False).execute()
+        profile_cache.invalidate(user_id)
+
+        if completed.data:
+            record_promoter_event(completed.data[0].get('promoter_code'), surveys_completed=1)
 
         return jsonify({'message': 'Survey submitted successfully'}), 201
 
     except Exception as e:
-        import traceback
-        print(f"[SURVEY ERROR] {str(e)}")
-        print(traceback.format_exc())
+        survey_log.exception("%s", e)
         return jsonify({'error': str(e)}), 400
 
 @surveys_bp.route('/<user_id>', methods=['GET'])
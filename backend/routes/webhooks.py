@@ -1,35 +1,46 @@
 from flask import Blueprint, request, jsonify
 from utils.supabase_client import get_supabase
-from datetime import datetime
-import json
+from utils.admin_auth import admin_required
+from utils.user_lookup import get_user_id_by_email
+from utils.webhook_dedup import delivery_key, delivery_store
+from utils.booking_events import EVENT_CREATED, EVENT_CANCELED, EVENT_RESCHEDULED, calendly_invitee_id, record_booking_event
+from utils.log import get_logger, LazyJson
 
 webhooks_bp = Blueprint('webhooks', __name__)
+webhook_log = get_logger('WEBHOOK')
 
 @webhooks_bp.route('/calendly', methods=['POST'])
 def calendly_webhook():
     """Handle Calendly webhook events"""
     data = request.json
     event_type = data.get('event')
+    dedup_key = delivery_key(event_type, data, request.get_data())
 
     try:
-        print(f"[WEBHOOK] Received Calendly event: {event_type}")
-        print(f"[WEBHOOK] Data: {json.dumps(data, indent=2)}")
+        # Calendly retries deliveries - acknowledge ones we already processed
+        try:
+            if delivery_store.is_duplicate(dedup_key):
+                webhook_log.info("Duplicate delivery acknowledged: %s", dedup_key)
+                return jsonify({'status': 'received', 'duplicate': True}), 200
+        except Exception as dedup_error:
+            webhook_log.warning("Deduplication check failed (non-critical): %s", dedup_error)
+
+        webhook_log.info("Received Calendly event: %s", event_type)
+        # Payload is only serialized when DEBUG is enabled for WEBHOOK
+        webhook_log.debug("Data: %s", LazyJson(data, indent=2))
 
         if event_type == 'invitee.created':
             # New booking created - store in bookings table
-            from utils.supabase_client import get_supabase_admin
-            admin_supabase = get_supabase_admin()
-            
-            payload = data.get('payload', {})
-            invitee = payload.get('invitee', {})
+            payload = data.get('payload', {}) or {}
+            # Invitee fields are either nested or at the top level of the payload
+            invitee = payload.get('invitee') or payload
             scheduled_event = payload.get('scheduled_event', {})
             event = payload.get('event', {})
             
             email = invitee.get('email')
             scheduled_time = scheduled_event.get('start_time')
             # Use invitee URI as the unique identifier
-            invitee_uri = invitee.get('uri', '')
-            calendly_event_id = invitee_uri.split('/')[-1] if invitee_uri and '/' in invitee_uri else invitee.get('uuid') or None
+            calendly_event_id = calendly_invitee_id(invitee)
             
             # Extract event type slug from event URI (e.g., "30min" or "new-meeting")
             event_uri = event.get('uri', '') if isinstance(event, dict) else event
@@ -54,49 +65,70 @@ def calendly_webhook():
                 # For now, we'll check bookings by matching the event URL pattern
                 pass
             
-            print(f"[WEBHOOK] Processing booking for email: {email}, scheduled_time: {scheduled_time}, invitee_id: {calendly_event_id}, event_type: {event_type_slug}")
+            webhook_log.debug("Processing booking for email: %s, scheduled_time: %s, invitee_id: %s, event_type: %s", email, scheduled_time, calendly_event_id, event_type_slug)
 
             if not email or not scheduled_time:
-                print(f"[WEBHOOK] Missing required data: email={email}, scheduled_time={scheduled_time}")
+                webhook_log.warning("Missing required data: email=%s, scheduled_time=%s", email, scheduled_time)
                 return jsonify({'status': 'received', 'message': 'Missing required data'}), 200
 
             # Find user by email
-            user_result = admin_supabase.table('users').select('id').eq('email', email).execute()
+            user_id = get_user_id_by_email(email)
             
-            if user_result.data and len(user_result.data) > 0:
-                user_id = user_result.data[0]['id']
-                
-                # Check if booking already exists for this invitee (by calendly_event_id)
-                existing = admin_supabase.table('bookings').select('*').eq('calendly_event_id', calendly_event_id).execute()
-                
-                if not existing.data or len(existing.data) == 0:
-                    # Create new booking in database
-                    booking_data = {
-                        'user_id': user_id,
-                        'calendly_event_id': calendly_event_id,
-                        'scheduled_time': scheduled_time,
-                        'status': 'confirmed',
-                        'created_at': datetime.now().isoformat()
-                    }
-                    result = admin_supabase.table('bookings').insert(booking_data).execute()
-                    print(f"[WEBHOOK] ✅ Created new booking for user {user_id}: {booking_data}")
+            if user_id:
+                # Append to the booking log; the bookings row is updated from it
+                booking, created = record_booking_event(
+                    EVENT_CREATED,
+                    calendly_event_id,
+                    user_id=user_id,
+                    scheduled_time=scheduled_time,
+                    source='webhook',
+                    details={'old_invitee': invitee.get('old_invitee')} if invitee.get('old_invitee') else None
+                )
+                if created:
+                    webhook_log.info("✅ Created new booking for user %s: %s", user_id, scheduled_time)
                 else:
-                    # Update existing booking
-                    admin_supabase.table('bookings').update({
-                        'user_id': user_id,
-                        'status': 'confirmed',
-                        'scheduled_time': scheduled_time,
-                    }).eq('id', existing.data[0]['id']).execute()
-                    print(f"[WEBHOOK] ✅ Updated existing booking for user {user_id}")
+                    webhook_log.info("✅ Updated existing booking for user %s", user_id)
             else:
-                print(f"[WEBHOOK] ⚠️ User not found for email: {email} - booking not stored")
+                webhook_log.warning("⚠️ User not found for email: %s - booking not stored", email)
 
         elif event_type == 'invitee.canceled':
-            # Booking cancelled
-            print("[WEBHOOK] Booking cancelled")
+            # Booking cancelled - Calendly also sends this for the old invitee of a reschedule
+            payload = data.get('payload', {}) or {}
+            # Invitee fields are either nested or at the top level of the payload
+            invitee = payload.get('invitee') or payload
+            calendly_event_id = calendly_invitee_id(invitee)
+            kind = EVENT_RESCHEDULED if invitee.get('rescheduled') else EVENT_CANCELED
+
+            if not calendly_event_id:
+                webhook_log.warning("Missing invitee identifier for cancellation")
+                return jsonify({'status': 'received', 'message': 'Missing required data'}), 200
+
+            booking, _ = record_booking_event(
+                kind,
+                calendly_event_id,
+                source='webhook',
+                details={'new_invitee': invitee.get('new_invitee')} if invitee.get('new_invitee') else None
+            )
+            if booking:
+                webhook_log.info("✅ Booking %s marked %s", calendly_event_id, booking.get('status'))
+            else:
+                webhook_log.warning("⚠️ No stored booking for invitee %s - event logged only", calendly_event_id)
+
+        try:
+            delivery_store.mark_processed(dedup_key, event_type)
+        except Exception as dedup_error:
+            webhook_log.warning("Failed to record delivery (non-critical): %s", dedup_error)
 
         return jsonify({'status': 'received'}), 200
 
     except Exception as e:
-        print(f"[WEBHOOK ERROR] {str(e)}")
+        webhook_log.exception("%s", e)
         return jsonify({'error': str(e)}), 400
+
+@webhooks_bp.route('/stats', methods=['GET'])
+@admin_required
+def webhook_stats():
+    """Get webhook deduplication counters for this worker:
+    cache_hits (duplicates caught by the cache), store_hits (duplicates
+    caught by the webhook_deliveries table) and misses (new deliveries)"""
+    return jsonify(delivery_store.stats()), 200
@@ -0,0 +1,94 @@
+"""Benchmark JSON encoding and response compression.
+
+Compares Flask's standard-library JSON provider against FastJSONProvider
+on synthetic /api/bookings and survey payloads, and reports bytes sent
+with and without compression.
+
+Run from the backend directory:
+
+    python -m scripts.bench_json [--rows 500] [--repeat 200]
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import FastJSONProvider, orjson
+from utils.compression import init_compression, brotli
+
+def booking_rows(count):
+    start = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+    return [{
+        'id': str(uuid.uuid4()),
+        'user_id': str(uuid.uuid4()),
+        'calendly_event_id': str(uuid.uuid4()),
+        'scheduled_time': (start + timedelta(hours=i)).isoformat(),
+        'status': 'confirmed',
+        'created_at': (start - timedelta(days=3, minutes=i)).isoformat()
+    } for i in range(count)]
+
+def survey_rows(count):
+    return [{
+        'id': str(uuid.uuid4()),
+        'user_id': str(uuid.uuid4()),
+        'goals': 'Build confidence speaking in meetings and presenting to senior leadership.',
+        'challenges': 'Imposter syndrome when working with more experienced colleagues.',
+        'experience_level': 'intermediate',
+        'additional_notes': 'Prefers morning sessions. ' * 3,
+        'created_at': datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat()
+    } for i in range(count)]
+
+def make_app(provider_class, compress):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    if compress:
+        init_compression(app)
+    return app
+
+def time_encode(app, payload, repeat):
+    with app.test_request_context():
+        jsonify(payload)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            jsonify(payload).get_data()
+        return (time.perf_counter() - started) / repeat * 1000
+
+def bytes_sent(app, payload, accept_encoding):
+    app.add_url_rule('/bench', 'bench', lambda: jsonify(payload))
+    response = app.test_client().get('/bench', headers={'Accept-Encoding': accept_encoding})
+    return len(response.get_data()), response.headers.get('Content-Encoding', 'identity')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoding and response compression')
+    parser.add_argument('--rows', type=int, default=500, help='Rows per payload')
+    parser.add_argument('--repeat', type=int, default=200, help='Encodes per measurement')
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if orjson else 'no (stdlib fallback)'}, brotli: {'yes' if brotli else 'no'}")
+    payloads = {
+        'bookings': booking_rows(args.rows),
+        'surveys': survey_rows(args.rows)
+    }
+
+    for name, payload in payloads.items():
+        stdlib_ms = time_encode(make_app(DefaultJSONProvider, False), payload, args.repeat)
+        fast_ms = time_encode(make_app(FastJSONProvider, False), payload, args.repeat)
+        print(f"\n{name} ({args.rows} rows)")
+        print(f"  encode  stdlib: {stdlib_ms:8.3f} ms   fast: {fast_ms:8.3f} ms   speedup: {stdlib_ms / fast_ms:5.1f}x")
+
+        baseline, _ = bytes_sent(make_app(DefaultJSONProvider, False), payload, 'identity')
+        print(f"  bytes   before: {baseline:8d}")
+        for accept_encoding in ('gzip', 'br, gzip'):
+            size, encoding = bytes_sent(make_app(FastJSONProvider, True), payload, accept_encoding)
+            print(f"  bytes   {encoding:>6}: {size:8d}   ({size / baseline:6.1%} of original)")
+
+if __name__ == '__main__':
+    main()
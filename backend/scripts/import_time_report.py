@@ -0,0 +1,69 @@
+"""Measure backend cold-start cost.
+
+Runs `import app` (and optionally warm_up()) in fresh interpreters with
+`python -X importtime` and reports the total import time and the slowest
+modules by cumulative time.
+
+Run from the backend directory:
+
+    python -m scripts.import_time_report [--runs 5] [--top 15] [--warm-up]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+
+def measure_once(warm_up):
+    """Return ({module: cumulative_us}, total_import_us, warm_up_seconds) for one fresh interpreter"""
+    code = "import app"
+    if warm_up:
+        code += "; import time; t = time.perf_counter(); app.warm_up(); print(time.perf_counter() - t)"
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=backend_dir, capture_output=True, text=True, check=True
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        # Keep the first (outermost) measurement of each module
+        modules.setdefault(name, int(cumulative))
+
+    warm_up_seconds = float(result.stdout.strip().splitlines()[-1]) if warm_up else None
+    return modules, modules.get('app', 0), warm_up_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description='Report backend import time')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules to list')
+    parser.add_argument('--warm-up', action='store_true', help='Also time app.warm_up()')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    runs = [measure_once(args.warm_up) for _ in range(args.runs)]
+
+    totals = [total / 1000 for _, total, _ in runs]
+    print(f"import app: median {statistics.median(totals):.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms ({args.runs} runs)")
+    if args.warm_up:
+        warm_ups = [warm * 1000 for _, _, warm in runs]
+        print(f"warm_up():  median {statistics.median(warm_ups):.1f} ms")
+
+    # Slowest modules by median cumulative time across runs
+    names = set().union(*(modules for modules, _, _ in runs))
+    medians = {name: statistics.median(modules.get(name, 0) for modules, _, _ in runs) for name in names}
+    scope = "import app + warm_up()" if args.warm_up else "import app"
+    print(f"\nslowest {args.top} modules during {scope} (cumulative, median):")
+    for name, cumulative in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    print(f"\nmeasured in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Backfill / reconcile bookings from Calendly.
+
+Streams every scheduled event and invitee from the Calendly API, matches
+invitees to `users` by email in memory and writes bookings through the
+booking log in batched upserts. Progress is checkpointed after every page
+so an interrupted run resumes where it stopped.
+
+--rebuild instead replays the whole booking log into the bookings table
+(disaster recovery) without calling Calendly.
+
+Run from the backend directory:
+
+    python -m scripts.reconcile_bookings [--status active] [--batch-size 200]
+    python -m scripts.reconcile_bookings --rebuild
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+backend_dir = Path(__file__).resolve().parent.parent
+load_dotenv(dotenv_path=backend_dir / '.env')
+sys.path.insert(0, str(backend_dir))
+
+import requests
+
+from routes.bookings import CALENDLY_API_URL
+from utils.supabase_client import get_supabase_admin
+from utils.user_lookup import normalize_email
+from utils.booking_events import EVENT_CREATED, EVENT_CANCELED, EVENT_RESCHEDULED, calendly_invitee_id, rebuild_bookings, record_booking_events_batch
+
+USERS_PAGE_SIZE = 1000
+MAX_RETRIES = 5
+
+def calendly_get(url, headers, params=None):
+    """GET a Calendly API URL, backing off on rate limits"""
+    for attempt in range(MAX_RETRIES):
+        response = requests.get(url, headers=headers, params=params, timeout=30)
+        if response.status_code == 429 or response.status_code >= 500:
+            delay = int(response.headers.get('Retry-After', 2 ** attempt))
+            print(f"[RECONCILE] Calendly returned {response.status_code}, retrying in {delay}s")
+            time.sleep(delay)
+            continue
+        response.raise_for_status()
+        return response.json()
+    raise RuntimeError(f"Calendly request failed after {MAX_RETRIES} attempts: {url}")
+
+def iter_pages(url, headers, params=None):
+    """Yield (collection, next_page_url) for every page of a Calendly collection"""
+    while url:
+        data = calendly_get(url, headers, params)
+        # next_page already carries the query string
+        params = None
+        url = (data.get('pagination') or {}).get('next_page')
+        yield data.get('collection', []), url
+
+def load_users_by_email(admin_supabase):
+    """Fetch every user once and index them by normalized email"""
+    users_by_email = {}
+    offset = 0
+    while True:
+        page = admin_supabase.table('users').select('id,email').order('id').range(offset, offset + USERS_PAGE_SIZE - 1).execute()
+        rows = page.data or []
+        for row in rows:
+            email = normalize_email(row.get('email'))
+            if email:
+                users_by_email[email] = row['id']
+        if len(rows) < USERS_PAGE_SIZE:
+            return users_by_email
+        offset += USERS_PAGE_SIZE
+
+def load_checkpoint(path):
+    if path.exists():
+        return json.loads(path.read_text())
+    return None
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(checkpoint))
+    tmp_path.replace(path)
+
+def reconcile(args):
+    api_key = os.getenv("CALENDLY_API_KEY")
+    if not api_key:
+        raise ValueError("CALENDLY_API_KEY is not set")
+
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+    admin_supabase = get_supabase_admin()
+    checkpoint_path = Path(args.checkpoint)
+
+    checkpoint = None if args.reset else load_checkpoint(checkpoint_path)
+    if checkpoint and not checkpoint.get('next_page'):
+        print(f"[RECONCILE] Checkpoint {checkpoint_path} is complete - use --reset to run again")
+        return
+
+    if checkpoint:
+        print(f"[RECONCILE] Resuming from page {checkpoint['pages'] + 1}")
+        url, params = checkpoint['next_page'], None
+    else:
+        checkpoint = {'pages': 0, 'events': 0, 'invitees': 0, 'matched': 0, 'written': 0, 'next_page': None}
+        url = f"{CALENDLY_API_URL}/scheduled_events"
+        params = {'count': args.page_size}
+        if args.status != 'all':
+            params['status'] = args.status
+        organization = args.organization or os.getenv("CALENDLY_ORGANIZATION_URI")
+        if organization:
+            params['organization'] = organization
+
+    started = time.monotonic()
+    users_by_email = load_users_by_email(admin_supabase)
+    print(f"[RECONCILE] Loaded {len(users_by_email)} users in {time.monotonic() - started:.1f}s")
+
+    run_events = 0
+    for scheduled_events, next_page in iter_pages(url, headers, params):
+        batch = []
+        for scheduled_event in scheduled_events:
+            event_uri = scheduled_event.get('uri', '')
+            event_uuid = event_uri.split('/')[-1] if event_uri else None
+            scheduled_time = scheduled_event.get('start_time')
+            if not event_uuid or not scheduled_time:
+                continue
+
+            invitees_url = f"{CALENDLY_API_URL}/scheduled_events/{event_uuid}/invitees"
+            for invitees, _ in iter_pages(invitees_url, headers, {'count': args.page_size}):
+                for invitee in invitees:
+                    checkpoint['invitees'] += 1
+                    user_id = users_by_email.get(normalize_email(invitee.get('email')))
+                    calendly_event_id = calendly_invitee_id(invitee)
+                    if not user_id or not calendly_event_id:
+                        continue
+
+                    checkpoint['matched'] += 1
+                    canceled = invitee.get('status') == 'canceled' or scheduled_event.get('status') == 'canceled'
+                    kind = EVENT_CREATED
+                    if canceled:
+                        # Same mapping as the invitee.canceled webhook
+                        kind = EVENT_RESCHEDULED if invitee.get('rescheduled') else EVENT_CANCELED
+                    batch.append({
+                        'kind': kind,
+                        'calendly_event_id': calendly_event_id,
+                        'user_id': user_id,
+                        'scheduled_time': scheduled_time,
+                        'details': {'old_invitee': invitee.get('old_invitee')} if invitee.get('old_invitee') else None
+                    })
+
+        checkpoint['events'] += len(scheduled_events)
+        run_events += len(scheduled_events)
+
+        if not args.dry_run:
+            for start in range(0, len(batch), args.batch_size):
+                checkpoint['written'] += record_booking_events_batch(batch[start:start + args.batch_size])
+
+        # Only checkpoint once the whole page is written
+        checkpoint['pages'] += 1
+        checkpoint['next_page'] = next_page
+        if not args.dry_run:
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.monotonic() - started
+        print(
+            f"[RECONCILE] page {checkpoint['pages']}: {checkpoint['events']} events, "
+            f"{checkpoint['matched']}/{checkpoint['invitees']} invitees matched, "
+            f"{checkpoint['written']} bookings written ({run_events / elapsed if elapsed else 0:.1f} events/s)"
+        )
+
+    elapsed = time.monotonic() - started
+    print(
+        f"[RECONCILE] ✅ Done in {elapsed:.1f}s: {checkpoint['events']} events, "
+        f"{checkpoint['written']} bookings written, {run_events / elapsed if elapsed else 0:.1f} events/s this run"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill and reconcile bookings from Calendly')
+    parser.add_argument('--status', choices=['active', 'canceled', 'all'], default='all', help='Scheduled event status to load')
+    parser.add_argument('--organization', help='Calendly organization URI (defaults to CALENDLY_ORGANIZATION_URI)')
+    parser.add_argument('--page-size', type=int, default=100, help='Calendly page size (max 100)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Bookings per upsert')
+    parser.add_argument('--checkpoint', default=str(backend_dir / '.reconcile_checkpoint.json'), help='Checkpoint file for resuming')
+    parser.add_argument('--reset', action='store_true', help='Ignore any existing checkpoint and start over')
+    parser.add_argument('--dry-run', action='store_true', help='Match invitees without writing bookings')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the bookings table from the booking log instead')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        started = time.monotonic()
+        rebuilt = rebuild_bookings()
+        print(f"[RECONCILE] ✅ Rebuilt {rebuilt} bookings from the booking log in {time.monotonic() - started:.1f}s")
+        return
+
+    reconcile(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""Replay a captured traffic log against the app.
+
+Plays the request shapes recorded by utils/traffic_capture.py (set
+TRAFFIC_CAPTURE_PATH on a running backend) through the Flask app in-process,
+with in-memory stand-ins for Supabase and Calendly that add a configurable
+latency per call. Requests are sent at their captured offsets, divided by
+--speed, and --multiply clones each request for additional synthetic
+clients. Reports latency percentiles and throughput per endpoint next to
+the latencies seen in the capture.
+
+Run from the backend directory:
+
+    python -m scripts.replay_traffic capture.jsonl [--speed 10] [--multiply 4] [--concurrency 64]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+REPLAY_EVENT_TYPE_UUID = 'replay-event-type'
+REPLAY_ADMIN_TOKEN = 'replay-admin-token'
+RULE_ARGUMENT = re.compile(r'<(?:[^:<>]+:)?([^<>]+)>')
+
+# --- Supabase stand-in ------------------------------------------------------
+
+class FakeDatabase:
+    """Tables of dict rows behind a lock, with a fixed latency per request"""
+
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+        self.tables = defaultdict(list)
+        self.lock = threading.Lock()
+        self.ids = 0
+
+    def wait(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def next_id(self):
+        self.ids += 1
+        return self.ids
+
+class FakeQuery:
+    """The subset of the postgrest query builder the backend uses"""
+
+    def __init__(self, database, table):
+        self.database = database
+        self.table = table
+        self.operation = 'select'
+        self.values = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.limit_count = None
+
+    def select(self, *columns, **kwargs):
+        return self
+
+    def insert(self, values, **kwargs):
+        self.operation, self.values = 'insert', values
+        return self
+
+    def upsert(self, values, on_conflict=None, ignore_duplicates=False, **kwargs):
+        self.operation, self.values = 'upsert', values
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values, **kwargs):
+        self.operation, self.values = 'update', values
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = 'delete'
+        return self
+
+    def _filter(self, column, test):
+        self.filters.append(lambda row: row.get(column) is not None and test(row.get(column)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        return self._filter(column, lambda current: current > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda current: current >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda current: current < value)
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def range(self, start, end):
+        return self
+
+    def _matches(self, rows):
+        return [row for row in rows if all(test(row) for test in self.filters)]
+
+    def execute(self):
+        self.database.wait()
+        with self.database.lock:
+            rows = self.database.tables[self.table]
+            if self.operation == 'select':
+                data = [dict(row) for row in self._matches(rows)]
+                return SimpleNamespace(data=data[:self.limit_count] if self.limit_count else data, count=len(data))
+
+            if self.operation == 'update':
+                matched = self._matches(rows)
+                for row in matched:
+                    row.update(self.values)
+                return SimpleNamespace(data=[dict(row) for row in matched], count=len(matched))
+
+            if self.operation == 'delete':
+                matched = self._matches(rows)
+                self.database.tables[self.table] = [row for row in rows if row not in matched]
+                return SimpleNamespace(data=matched, count=len(matched))
+
+            written = []
+            for values in self.values if isinstance(self.values, list) else [self.values]:
+                existing = None
+                if self.operation == 'upsert' and self.on_conflict:
+                    existing = next((row for row in rows if row.get(self.on_conflict) == values.get(self.on_conflict)), None)
+                if existing is not None:
+                    if not self.ignore_duplicates:
+                        existing.update(values)
+                        written.append(dict(existing))
+                    continue
+                row = dict(values)
+                row.setdefault('id', self.database.next_id())
+                rows.append(row)
+                written.append(dict(row))
+            return SimpleNamespace(data=written, count=len(written))
+
+class FakeAuth:
+    def __init__(self, database, users_by_token):
+        self.database = database
+        self.users_by_token = users_by_token
+        self.admin = SimpleNamespace(create_user=self.create_user, generate_link=self.generate_link)
+
+    def _session(self, user):
+        return SimpleNamespace(
+            user=SimpleNamespace(id=user['id'], email=user['email'], email_confirmed_at=datetime.now(timezone.utc).isoformat()),
+            session=SimpleNamespace(access_token=f"replay-token-{user['id']}", refresh_token='replay-refresh')
+        )
+
+    def _user(self, email):
+        return {'id': str(uuid.uuid5(uuid.NAMESPACE_URL, email)), 'email': email}
+
+    def get_user(self, token):
+        self.database.wait()
+        user = self.users_by_token.get(token)
+        return SimpleNamespace(user=SimpleNamespace(**user)) if user else None
+
+    def sign_up(self, credentials):
+        self.database.wait()
+        return self._session(self._user(credentials['email']))
+
+    def sign_in_with_password(self, credentials):
+        self.database.wait()
+        return self._session(self._user(credentials['email']))
+
+    def verify_otp(self, params):
+        self.database.wait()
+        return self._session(self._user(params.get('email') or 'replay@example.com'))
+
+    def sign_out(self):
+        self.database.wait()
+
+    def create_user(self, attributes):
+        self.database.wait()
+        return self._session(self._user(attributes['email']))
+
+    def generate_link(self, params):
+        self.database.wait()
+        return SimpleNamespace(properties=SimpleNamespace(action_link='https://example.com/confirm'))
+
+class FakeSupabaseClient:
+    def __init__(self, database, users_by_token):
+        self.database = database
+        self.auth = FakeAuth(database, users_by_token)
+
+    def table(self, name):
+        return FakeQuery(self.database, name)
+
+    def rpc(self, name, params=None):
+        query = FakeQuery(self.database, f'rpc:{name}')
+        query.operation, query.values = 'insert', dict(params or {})
+        return query
+
+def install_fake_supabase(database, users_by_token):
+    """Make `from supabase import create_client` return the stand-in"""
+    module = types.ModuleType('supabase')
+    module.create_client = lambda url, key: FakeSupabaseClient(database, users_by_token)
+    sys.modules['supabase'] = module
+
+# --- Calendly stand-in ------------------------------------------------------
+
+class FakeCalendlyResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {}
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self.payload
+
+class FakeCalendly:
+    """Canned responses for the Calendly endpoints the backend calls"""
+
+    def __init__(self, latency_seconds, users):
+        self.latency_seconds = latency_seconds
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.events = [{
+            'uri': f'https://api.calendly.com/scheduled_events/replay-event-{index}',
+            'start_time': (start + timedelta(hours=index)).isoformat(),
+            'event_type': {'slug': '30min'},
+            'invitee_email': user['email']
+        } for index, user in enumerate(users[:20])]
+        self.available_times = [{
+            'status': 'available',
+            'start_time': (start + timedelta(minutes=30 * slot)).isoformat(),
+            'invitees_remaining': 1
+        } for slot in range(7 * 16)]
+
+    def get(self, url, headers=None, params=None, timeout=None, **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        path = url.split('api.calendly.com', 1)[-1]
+
+        if path.endswith('/invitees'):
+            event_uuid = path.split('/')[-2]
+            event = next((event for event in self.events if event['uri'].endswith(event_uuid)), None)
+            invitees = [{
+                'uri': f"{event['uri']}/invitees/{event_uuid}-invitee",
+                'email': event['invitee_email'],
+                'status': 'active'
+            }] if event else []
+            return FakeCalendlyResponse(200, {'collection': invitees})
+        if '/scheduled_events' in path:
+            events = [{key: value for key, value in event.items() if key != 'invitee_email'} for event in self.events]
+            return FakeCalendlyResponse(200, {'collection': events, 'pagination': {'next_page': None}})
+        if '/event_type_available_times' in path:
+            return FakeCalendlyResponse(200, {'collection': self.available_times})
+        if '/event_types/' in path:
+            return FakeCalendlyResponse(200, {'resource': {
+                'uri': f'https://api.calendly.com/event_types/{path.split("/")[-1]}',
+                'slug': '30min',
+                'duration': 30
+            }})
+        return FakeCalendlyResponse(404, {'message': 'Not found'})
+
+    def post(self, url, **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return FakeCalendlyResponse(201, {})
+
+# --- Replay -----------------------------------------------------------------
+
+def load_capture(path, multiply):
+    records = []
+    with open(path, encoding='utf-8') as capture:
+        for line in capture:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records = [record for record in records if record.get('r')]
+    records.sort(key=lambda record: record['ts'])
+
+    # Clones get their own client key so per-user caches behave as with more users
+    replayed = []
+    for record in records:
+        for copy in range(multiply):
+            clone = dict(record)
+            if copy and clone.get('u'):
+                clone['u'] = f"{clone['u']}-{copy}"
+            replayed.append(clone)
+    return replayed
+
+def build_users(records):
+    users = {}
+    for record in records:
+        key = record.get('u')
+        if key and key not in users:
+            index = len(users)
+            users[key] = {
+                'id': str(uuid.uuid5(uuid.NAMESPACE_URL, f'replay-user-{key}')),
+                'email': f'replay-user-{index}@example.com',
+                'token': f'replay-token-{key}'
+            }
+    return users
+
+def seed_database(database, users):
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    for index, user in enumerate(users.values()):
+        database.tables['users'].append({
+            'id': user['id'],
+            'email': user['email'],
+            'full_name': f'Replay User {index}',
+            'promoter_code': 'replay' if index % 3 == 0 else None,
+            'survey_completed': index % 2 == 0
+        })
+        if index % 2 == 0:
+            database.tables['bookings'].append({
+                'id': database.next_id(),
+                'user_id': user['id'],
+                'calendly_event_id': f'replay-booking-{index}',
+                'scheduled_time': (start + timedelta(hours=index)).isoformat(),
+                'status': 'confirmed',
+                'created_at': datetime.now(timezone.utc).isoformat()
+            })
+
+def body_value(name, user, sequence):
+    email = user['email'] if user else f'replay-new-{sequence}@example.com'
+    return {
+        'email': email,
+        'password': 'replay-password',
+        'full_name': 'Replay User',
+        'promoter_code': 'replay',
+        'token': '123456',
+        'token_hash': 'replay-hash',
+        'type': 'signup',
+        'calendly_event_id': f'replay-book-{sequence}',
+        'scheduled_time': (datetime.now(timezone.utc) + timedelta(days=2)).isoformat(),
+        'users': [{'email': f'replay-bulk-{sequence}-{i}@example.com', 'full_name': 'Replay User'} for i in range(5)]
+    }.get(name, 'replay')
+
+def pair_webhooks(records):
+    """Point each canceled webhook at an invitee created earlier in the replay"""
+    created = []
+    for sequence, record in enumerate(records):
+        if record.get('ev') == 'invitee.created':
+            record['invitee'] = f'replay-invitee-{sequence}'
+            created.append(record['invitee'])
+        elif record.get('ev'):
+            record['invitee'] = created.pop(0) if created else f'replay-invitee-{sequence}'
+
+def webhook_body(event_type, invitee_uuid, user):
+    return {
+        'event': event_type,
+        'payload': {
+            'invitee': {
+                'uri': f'https://api.calendly.com/scheduled_events/replay-event/invitees/{invitee_uuid}',
+                'email': user['email'] if user else 'replay-user-0@example.com',
+                'rescheduled': False
+            },
+            'scheduled_event': {
+                'uri': 'https://api.calendly.com/scheduled_events/replay-event',
+                'start_time': (datetime.now(timezone.utc) + timedelta(days=3)).isoformat(),
+                'event_type': {'slug': '30min'}
+            },
+            'event': {'uri': f'https://api.calendly.com/event_types/{REPLAY_EVENT_TYPE_UUID}'}
+        }
+    }
+
+def build_request(record, users, sequence):
+    """Turn a captured shape into (method, path, kwargs) for the test client"""
+    user = users.get(record.get('u'))
+
+    def fill(match):
+        if match.group(1) == 'user_id' and user:
+            return user['id']
+        return 'replay'
+
+    headers = {'X-Admin-Token': REPLAY_ADMIN_TOKEN}
+    if user:
+        headers['Authorization'] = f"Bearer {user['token']}"
+    kwargs = {'headers': headers}
+
+    query = {name: {'hours': '24', 'event_type': REPLAY_EVENT_TYPE_UUID}.get(name, 'replay') for name in record.get('q', [])}
+    if query:
+        kwargs['query_string'] = query
+
+    if record.get('ev'):
+        kwargs['json'] = webhook_body(record['ev'], record['invitee'], user)
+    elif record.get('k') is not None:
+        kwargs['json'] = {name: body_value(name, user, sequence) for name in record['k']}
+
+    return record['m'], RULE_ARGUMENT.sub(fill, record['r']), kwargs
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def replay(app, records, users, speed, concurrency):
+    local = threading.local()
+    results = defaultdict(list)
+    results_lock = threading.Lock()
+    lags = []
+
+    def send(record, sequence, due):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, path, kwargs = build_request(record, users, sequence)
+        started = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response.close()
+        with results_lock:
+            lags.append(max(0.0, started - due) * 1000)
+            results[f"{record['m']} {record['r']}"].append((elapsed_ms, response.status_code, record.get('ms')))
+
+    first_ts = records[0]['ts']
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for sequence, record in enumerate(records):
+            due = started + (record['ts'] - first_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, record, sequence, due)
+    return results, lags, time.perf_counter() - started
+
+def report(results, lags, elapsed):
+    rows = []
+    total = sum(len(samples) for samples in results.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    print(f"schedule lag: p50 {percentile(lags, 0.5):.1f} ms, p99 {percentile(lags, 0.99):.1f} ms "
+          f"(high lag means --concurrency is the bottleneck, not the app)\n")
+    print(f"{'endpoint':<45} {'count':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'5xx':>5} {'shed':>5} {'capt p95':>9}")
+    for endpoint, samples in sorted(results.items(), key=lambda item: -len(item[1])):
+        latencies = [sample[0] for sample in samples]
+        captured = [sample[2] for sample in samples if sample[2] is not None]
+        row = {
+            'endpoint': endpoint,
+            'count': len(samples),
+            'rps': len(samples) / elapsed,
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': max(latencies),
+            'errors': sum(1 for sample in samples if sample[1] >= 500 and sample[1] != 503),
+            'shed': sum(1 for sample in samples if sample[1] in (429, 503)),
+            'captured_p95_ms': percentile(captured, 0.95) if captured else None
+        }
+        rows.append(row)
+        captured_p95 = f"{row['captured_p95_ms']:.1f}" if captured else '-'
+        print(f"{endpoint:<45} {row['count']:>6} {row['rps']:>7.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['errors']:>5} {row['shed']:>5} {captured_p95:>9}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured traffic against the app with local Supabase/Calendly stand-ins')
+    parser.add_argument('capture', help='JSON lines file written with TRAFFIC_CAPTURE_PATH')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed (2 = twice as fast as captured)')
+    parser.add_argument('--multiply', type=int, default=1, help='Send each request this many times as different clients')
+    parser.add_argument('--concurrency', type=int, default=32, help='Maximum requests in flight')
+    parser.add_argument('--supabase-latency-ms', type=float, default=15.0, help='Latency added to each Supabase call')
+    parser.add_argument('--calendly-latency-ms', type=float, default=150.0, help='Latency added to each Calendly call')
+    parser.add_argument('--limit', type=int, help='Replay only the first N captured requests')
+    parser.add_argument('--json', help='Also write the per-endpoint report to this file')
+    args = parser.parse_args()
+
+    records = load_capture(args.capture, args.multiply)
+    if args.limit:
+        records = records[:args.limit * args.multiply]
+    if not records:
+        parser.error('capture contains no requests')
+
+    pair_webhooks(records)
+    users = build_users(records)
+    database = FakeDatabase(args.supabase_latency_ms / 1000)
+    seed_database(database, users)
+    install_fake_supabase(database, {user['token']: {'id': user['id'], 'email': user['email']} for user in users.values()})
+    calendly = FakeCalendly(args.calendly_latency_ms / 1000, list(users.values()))
+
+    # Point everything at the stand-ins before the app reads its configuration
+    os.environ.update({
+        'SUPABASE_URL': 'http://replay.invalid',
+        'SUPABASE_KEY': 'replay',
+        'SUPABASE_SERVICE_ROLE_KEY': 'replay',
+        'CALENDLY_API_KEY': 'replay',
+        'CALENDLY_EVENT_TYPE_UUID': REPLAY_EVENT_TYPE_UUID,
+        'CALENDLY_USERNAME': 'replay',
+        'ADMIN_API_TOKEN': REPLAY_ADMIN_TOKEN,
+        'CACHE_DB_PATH': os.path.join(tempfile.mkdtemp(prefix='replay-cache-'), 'cache.db')
+    })
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.pop('TRAFFIC_CAPTURE_PATH', None)
+
+    with mock.patch('requests.get', calendly.get), mock.patch('requests.post', calendly.post):
+        from app import app
+        print(f"Replaying {len(records)} requests from {len(users)} clients at {args.speed}x")
+        results, lags, elapsed = replay(app, records, users, args.speed, args.concurrency)
+
+    rows = report(results, lags, elapsed)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({'requests': len(records), 'elapsed_seconds': elapsed, 'endpoints': rows}, output, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+-- Email lookups (resend-confirmation, Calendly webhooks) query users.email
+-- with the normalized (trimmed, lower-cased) address.
+
+update public.users
+set email = lower(trim(email))
+where email is not null and email <> lower(trim(email));
+
+create index if not exists users_email_idx on public.users (email);
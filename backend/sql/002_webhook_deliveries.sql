@@ -0,0 +1,11 @@
+-- Processed Calendly webhook deliveries, used to acknowledge retries
+-- without reprocessing them. Rows past expires_at are purged by the backend.
+
+create table if not exists public.webhook_deliveries (
+    delivery_key text primary key,
+    event_type text not null,
+    received_at timestamptz not null default now(),
+    expires_at timestamptz not null
+);
+
+create index if not exists webhook_deliveries_expires_at_idx on public.webhook_deliveries (expires_at);
@@ -0,0 +1,53 @@
+-- Append-only booking event log. The bookings table is materialized from it
+-- one event at a time and keyed by calendly_event_id (the invitee UUID).
+
+create table if not exists public.booking_events (
+    id bigint generated always as identity primary key,
+    kind text not null check (kind in ('created', 'canceled', 'rescheduled')),
+    calendly_event_id text not null,
+    user_id uuid,
+    scheduled_time timestamptz,
+    source text not null default 'api',
+    details jsonb not null default '{}'::jsonb,
+    occurred_at timestamptz not null default now()
+);
+
+create index if not exists booking_events_calendly_event_id_idx on public.booking_events (calendly_event_id);
+
+-- Earlier code could store the same invitee twice (the existence checks were
+-- not atomic), so keep only the newest row per calendly_event_id before
+-- adding the unique index that booking upserts conflict on.
+delete from public.bookings b
+using (
+    select ctid, row_number() over (
+        partition by calendly_event_id
+        order by created_at desc nulls last, ctid desc
+    ) as position
+    from public.bookings
+    where calendly_event_id is not null
+) ranked
+where b.ctid = ranked.ctid and ranked.position > 1;
+
+-- Seed the log with every booking made before it existed, so a rebuild from
+-- the log (scripts/reconcile_bookings.py --rebuild) keeps them. Each seed
+-- event carries the full booking state.
+insert into public.booking_events (kind, calendly_event_id, user_id, scheduled_time, source, occurred_at)
+select
+    case b.status
+        when 'canceled' then 'canceled'
+        when 'rescheduled' then 'rescheduled'
+        else 'created'
+    end,
+    b.calendly_event_id,
+    b.user_id,
+    b.scheduled_time,
+    'migration',
+    coalesce(b.created_at, now())
+from public.bookings b
+where b.calendly_event_id is not null
+  and not exists (
+      select 1 from public.booking_events e where e.calendly_event_id = b.calendly_event_id
+  )
+order by b.created_at nulls first;
+
+create unique index if not exists bookings_calendly_event_id_key on public.bookings (calendly_event_id);
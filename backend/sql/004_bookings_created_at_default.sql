@@ -0,0 +1,3 @@
+-- Bulk upserts (scripts/reconcile_bookings.py) leave created_at to the database.
+
+alter table public.bookings alter column created_at set default now();
@@ -0,0 +1,47 @@
+-- Per-promoter attribution counters, maintained incrementally by the backend
+-- on registration, survey completion and new bookings.
+
+create table if not exists public.promoter_stats (
+    promoter_code text primary key,
+    signups integer not null default 0,
+    surveys_completed integer not null default 0,
+    bookings integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function public.increment_promoter_stats(
+    p_promoter_code text,
+    p_signups integer default 0,
+    p_surveys_completed integer default 0,
+    p_bookings integer default 0
+) returns void
+language sql
+as $$
+    insert into public.promoter_stats (promoter_code, signups, surveys_completed, bookings, updated_at)
+    values (p_promoter_code, p_signups, p_surveys_completed, p_bookings, now())
+    on conflict (promoter_code) do update set
+        signups = promoter_stats.signups + excluded.signups,
+        surveys_completed = promoter_stats.surveys_completed + excluded.surveys_completed,
+        bookings = promoter_stats.bookings + excluded.bookings,
+        updated_at = now();
+$$;
+
+-- One-time backfill from existing rows. A reschedule leaves the original
+-- booking 'rescheduled' and adds a new one, so only the other statuses are
+-- counted - one booking per reschedule chain, as the backend counts them.
+insert into public.promoter_stats (promoter_code, signups, surveys_completed, bookings)
+select
+    u.promoter_code,
+    count(*),
+    count(*) filter (where u.survey_completed),
+    coalesce(sum(b.booking_count), 0)
+from public.users u
+left join (
+    select user_id, count(*) as booking_count
+    from public.bookings
+    where status <> 'rescheduled'
+    group by user_id
+) b on b.user_id = u.id
+where u.promoter_code is not null and u.promoter_code <> ''
+group by u.promoter_code
+on conflict (promoter_code) do nothing;
@@ -0,0 +1,11 @@
+-- One row per reminder sent; the primary key lets exactly one worker (on
+-- any host) claim each reminder.
+
+create table if not exists public.booking_reminders (
+    calendly_event_id text not null,
+    lead_minutes integer not null,
+    sent_at timestamptz not null default now(),
+    primary key (calendly_event_id, lead_minutes)
+);
+
+create index if not exists bookings_status_scheduled_time_idx on public.bookings (status, scheduled_time);
@@ -0,0 +1,19 @@
+import hmac
+import os
+from functools import wraps
+from flask import jsonify, request
+
+def admin_required(view):
+    """Require the X-Admin-Token header to match ADMIN_API_TOKEN"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = os.getenv('ADMIN_API_TOKEN')
+        if not expected:
+            return jsonify({'error': 'Admin API not configured'}), 503
+
+        provided = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(provided, expected):
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from flask import g, jsonify, request
+from utils.log import get_logger
+
+# Admission control: every request (except health checks and CORS
+# preflights) takes a slot from a shared pool before it runs. Each priority
+# class has its own concurrency cap and bounded wait queue; when slots free
+# up they go to the highest-priority waiter. Requests that can't be queued,
+# or wait too long, are rejected immediately with Retry-After so overload
+# can't pile up behind busy worker threads.
+#
+# A queued request still holds a server thread while it waits. Polling reads
+# and webhooks therefore never queue (they are shed at once), and all
+# non-auth requests together - running or waiting - hold at most
+# ADMISSION_TOTAL_SLOTS - ADMISSION_AUTH_RESERVE threads, so login and
+# registration always reach the controller.
+#
+#   ADMISSION_CONTROL=off        disable
+#   ADMISSION_TOTAL_SLOTS=16     the worker's thread count (e.g. gunicorn --threads)
+#   ADMISSION_AUTH_RESERVE=2     threads only auth requests may occupy
+PRIORITY_AUTH = 'auth'
+PRIORITY_BOOKING_WRITE = 'booking_write'
+PRIORITY_POLLING_READ = 'polling_read'
+PRIORITY_WEBHOOK = 'webhook'
+
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'on') != 'off'
+ADMISSION_TOTAL_SLOTS = int(os.getenv('ADMISSION_TOTAL_SLOTS', '16'))
+ADMISSION_AUTH_RESERVE = int(os.getenv('ADMISSION_AUTH_RESERVE', str(max(1, ADMISSION_TOTAL_SLOTS // 8))))
+
+admission_log = get_logger('ADMISSION')
+
+class PriorityClass:
+    """Limits for one priority class (lower rank = served first)"""
+
+    def __init__(self, name, rank, max_concurrent, max_waiting, wait_timeout, reject_status, retry_after):
+        self.name = name
+        self.rank = rank
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.reject_status = reject_status
+        self.retry_after = retry_after
+
+def default_priority_classes(total_slots):
+    """auth > booking writes > polling reads > webhooks (Calendly retries rejected deliveries)"""
+    return {
+        PRIORITY_AUTH: PriorityClass(PRIORITY_AUTH, 0, total_slots, 64, 5.0, 503, 1),
+        PRIORITY_BOOKING_WRITE: PriorityClass(PRIORITY_BOOKING_WRITE, 1, max(1, total_slots * 3 // 4), max(1, total_slots // 4), 3.0, 503, 2),
+        PRIORITY_POLLING_READ: PriorityClass(PRIORITY_POLLING_READ, 2, max(1, total_slots // 2), 0, 0, 429, 5),
+        PRIORITY_WEBHOOK: PriorityClass(PRIORITY_WEBHOOK, 3, max(1, total_slots // 4), 0, 0, 503, 30)
+    }
+
+class AdmissionController:
+    """Shared slot pool with per-class caps, bounded queues and priority hand-off"""
+
+    def __init__(self, total_slots, classes, reserve=0, reserved_class=PRIORITY_AUTH):
+        self.total_slots = total_slots
+        self.classes = classes
+        # Threads that only reserved_class may hold, running or waiting
+        self.reserve = reserve
+        self.reserved_class = reserved_class
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._running = {name: 0 for name in classes}
+        self._waiting = {name: 0 for name in classes}
+        self._waiters = []
+        self._seq = 0
+        self.admitted = {name: 0 for name in classes}
+        self.rejected = {name: 0 for name in classes}
+
+    def _has_capacity(self, name):
+        return self._in_use < self.total_slots and self._running[name] < self.classes[name].max_concurrent
+
+    def _unreserved_occupancy(self):
+        """Threads held (running or waiting) by classes other than the reserved one"""
+        return sum(
+            self._running[name] + self._waiting[name]
+            for name in self.classes
+            if name != self.reserved_class
+        )
+
+    def _next_waiter(self):
+        """The highest-priority waiter whose class has capacity, or None"""
+        for ticket in self._waiters:
+            if self._has_capacity(ticket[2]):
+                return ticket
+        return None
+
+    def _take(self, name):
+        self._in_use += 1
+        self._running[name] += 1
+        self.admitted[name] += 1
+
+    def acquire(self, name):
+        """Take a slot for class `name`; returns False if the request should be shed"""
+        priority_class = self.classes[name]
+        with self._cond:
+            if name != self.reserved_class and self._unreserved_occupancy() >= self.total_slots - self.reserve:
+                self.rejected[name] += 1
+                return False
+
+            if self._has_capacity(name) and self._next_waiter() is None:
+                self._take(name)
+                return True
+
+            if self._waiting[name] >= priority_class.max_waiting:
+                self.rejected[name] += 1
+                return False
+
+            self._seq += 1
+            ticket = (priority_class.rank, self._seq, name)
+            self._waiters.append(ticket)
+            self._waiters.sort()
+            self._waiting[name] += 1
+
+            deadline = time.monotonic() + priority_class.wait_timeout
+            try:
+                while self._next_waiter() != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected[name] += 1
+                        return False
+                    self._cond.wait(remaining)
+
+                self._take(name)
+                return True
+            finally:
+                self._waiters.remove(ticket)
+                self._waiting[name] -= 1
+                # Our departure may make another waiter eligible
+                self._cond.notify_all()
+
+    def release(self, name):
+        with self._cond:
+            self._in_use -= 1
+            self._running[name] -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                name: {
+                    'running': self._running[name],
+                    'waiting': self._waiting[name],
+                    'admitted': self.admitted[name],
+                    'rejected': self.rejected[name]
+                }
+                for name in self.classes
+            }
+
+def classify_request():
+    """Map the current request to a priority class, or None if it is exempt"""
+    if request.method == 'OPTIONS' or request.blueprint is None:
+        return None
+    if request.blueprint == 'auth':
+        return PRIORITY_AUTH
+    if request.blueprint == 'webhooks' and request.method == 'POST':
+        return PRIORITY_WEBHOOK
+    if request.method in ('GET', 'HEAD'):
+        return PRIORITY_POLLING_READ
+    return PRIORITY_BOOKING_WRITE
+
+controller = AdmissionController(
+    ADMISSION_TOTAL_SLOTS,
+    default_priority_classes(ADMISSION_TOTAL_SLOTS),
+    reserve=ADMISSION_AUTH_RESERVE
+)
+
+def admit_request():
+    name = classify_request()
+    if name is None:
+        return None
+
+    if not controller.acquire(name):
+        priority_class = controller.classes[name]
+        admission_log.info("Shedding %s %s (%s)", request.method, request.path, name)
+        response = jsonify({'error': 'Server is busy, please retry shortly'})
+        response.status_code = priority_class.reject_status
+        response.headers['Retry-After'] = str(priority_class.retry_after)
+        return response
+
+    g.admission_class = name
+    return None
+
+def release_request(exc=None):
+    name = g.pop('admission_class', None)
+    if name is not None:
+        controller.release(name)
+
+def init_admission_control(app):
+    """Register admission control on the Flask app"""
+    if not ADMISSION_CONTROL:
+        return
+    app.before_request(admit_request)
+    app.teardown_request(release_request)
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from utils.booking_events import add_booking_event_listener
+from utils.cache import TieredCache
+from utils.log import get_logger
+
+# Availability snapshots (event type + open slots) for the configured Calendly
+# event types. A background thread refreshes them before they go stale, and
+# requests are served from the cache: a stale snapshot is returned at once
+# while a refresh runs in the background, so the booking page only waits on
+# Calendly when nothing has been fetched yet.
+CALENDLY_API_URL = "https://api.calendly.com/v1"
+CALENDLY_API_KEY = os.getenv("CALENDLY_API_KEY")
+
+# Snapshots younger than this are fresh
+AVAILABILITY_REFRESH_SECONDS = int(os.getenv('AVAILABILITY_REFRESH_SECONDS', '60'))
+# Stale snapshots are still served up to this age
+AVAILABILITY_MAX_STALE_SECONDS = int(os.getenv('AVAILABILITY_MAX_STALE_SECONDS', '3600'))
+# Calendly returns at most 7 days of available times per request
+AVAILABILITY_WINDOW_DAYS = min(int(os.getenv('AVAILABILITY_WINDOW_DAYS', '7')), 7)
+AVAILABILITY_TIMEOUT_SECONDS = float(os.getenv('AVAILABILITY_TIMEOUT_SECONDS', '10'))
+# Snapshots whose slot fetch failed are retried after this many seconds
+AVAILABILITY_ERROR_RETRY_SECONDS = int(os.getenv('AVAILABILITY_ERROR_RETRY_SECONDS', '10'))
+
+availability_cache = TieredCache('calendly_availability', AVAILABILITY_MAX_STALE_SECONDS, max_entries=64)
+availability_log = get_logger('AVAILABILITY')
+
+class AvailabilityError(Exception):
+    """Calendly could not be reached and there is no snapshot to fall back on"""
+
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+def configured_event_types():
+    """Event type UUIDs from CALENDLY_EVENT_TYPE_UUID (comma-separated)"""
+    value = os.getenv("CALENDLY_EVENT_TYPE_UUID") or ''
+    return [uuid.strip() for uuid in value.split(',') if uuid.strip()]
+
+def fetch_snapshot(event_type_uuid):
+    """Fetch an event type and its available times from Calendly.
+
+    The available times are best-effort: if that call fails the snapshot
+    still carries the event type, with no slots and `available_times_error`."""
+    import requests
+    headers = {
+        'Authorization': f'Bearer {CALENDLY_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+
+    response = requests.get(f"{CALENDLY_API_URL}/event_types/{event_type_uuid}", headers=headers, timeout=AVAILABILITY_TIMEOUT_SECONDS)
+    if response.status_code != 200:
+        raise AvailabilityError('Failed to fetch Calendly availability', response.status_code)
+    event_type = response.json().get('resource', {})
+
+    # start_time must be in the future
+    start = datetime.now(timezone.utc) + timedelta(minutes=1)
+    end = start + timedelta(days=AVAILABILITY_WINDOW_DAYS) - timedelta(minutes=2)
+    available_times = []
+    available_times_error = None
+    try:
+        response = requests.get(
+            f"{CALENDLY_API_URL}/event_type_available_times",
+            headers=headers,
+            params={
+                'event_type': event_type.get('uri') or event_type_uuid,
+                'start_time': start.isoformat().replace('+00:00', 'Z'),
+                'end_time': end.isoformat().replace('+00:00', 'Z')
+            },
+            timeout=AVAILABILITY_TIMEOUT_SECONDS
+        )
+        if response.status_code == 200:
+            available_times = response.json().get('collection', [])
+        else:
+            available_times_error = f'Calendly returned {response.status_code}'
+    except Exception as e:
+        available_times_error = 'Calendly request failed'
+        availability_log.warning("Available times fetch failed for %s: %s", event_type_uuid, e)
+
+    fetched_at = time.time()
+    return {
+        'resource': event_type,
+        'available_times': available_times,
+        'available_times_error': available_times_error,
+        'fetched_at': datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(),
+        'fetched_ts': fetched_at
+    }
+
+def _is_stale(snapshot, now=None):
+    age = (now or time.time()) - snapshot['fetched_ts']
+    if snapshot.get('available_times_error'):
+        return age >= min(AVAILABILITY_ERROR_RETRY_SECONDS, AVAILABILITY_REFRESH_SECONDS)
+    return age >= AVAILABILITY_REFRESH_SECONDS
+
+def _store_snapshot(event_type_uuid, snapshot):
+    # set() only reaches this worker's memory tier; invalidating first makes
+    # every other worker on the host drop its copy and re-read the shared tier.
+    availability_cache.invalidate(event_type_uuid)
+    availability_cache.set(event_type_uuid, snapshot)
+
+# event type UUID -> lock held while this process refreshes it
+_refresh_locks = {}
+_refresh_locks_guard = threading.Lock()
+
+def _refresh_lock(event_type_uuid):
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(event_type_uuid, threading.Lock())
+
+def refresh_snapshot(event_type_uuid, force=False):
+    """Fetch and store a new snapshot unless one is fresh (or a refresh is running).
+
+    Returns the current snapshot, or None if another thread is refreshing."""
+    lock = _refresh_lock(event_type_uuid)
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        snapshot = availability_cache.get(event_type_uuid)
+        # Another worker may have refreshed it already
+        if not force and snapshot and not _is_stale(snapshot):
+            return snapshot
+        snapshot = fetch_snapshot(event_type_uuid)
+        _store_snapshot(event_type_uuid, snapshot)
+        availability_log.debug("Refreshed availability for %s (%s slots)", event_type_uuid, len(snapshot['available_times']))
+        return snapshot
+    finally:
+        lock.release()
+
+def _refresh_in_background(event_type_uuid, force=False):
+    # A refresh already running will store a new snapshot; don't start another
+    if _refresh_lock(event_type_uuid).locked():
+        return
+    def run():
+        try:
+            refresh_snapshot(event_type_uuid, force)
+        except Exception as e:
+            availability_log.warning("Availability refresh failed for %s: %s", event_type_uuid, e)
+    threading.Thread(target=run, name='availability-refresh', daemon=True).start()
+
+def get_availability(event_type_uuid):
+    """Return the snapshot for an event type with `age_seconds` and `stale` added.
+
+    Stale snapshots are returned immediately and refreshed in the background.
+    Only a missing snapshot is fetched inline."""
+    snapshot = availability_cache.get(event_type_uuid)
+    if snapshot is None:
+        with _refresh_lock(event_type_uuid):
+            snapshot = availability_cache.get(event_type_uuid)
+            if snapshot is None:
+                snapshot = fetch_snapshot(event_type_uuid)
+                _store_snapshot(event_type_uuid, snapshot)
+
+    now = time.time()
+    age = now - snapshot['fetched_ts']
+    stale = _is_stale(snapshot, now)
+    if stale:
+        _refresh_in_background(event_type_uuid)
+    return dict(snapshot, age_seconds=round(age, 1), stale=stale)
+
+def _on_booking_event(event):
+    # A booking or cancellation changes the open slots
+    for event_type_uuid in configured_event_types():
+        _refresh_in_background(event_type_uuid, force=True)
+
+_started = False
+_start_lock = threading.Lock()
+
+def _refresh_loop():
+    while True:
+        for event_type_uuid in configured_event_types():
+            try:
+                refresh_snapshot(event_type_uuid)
+            except Exception as e:
+                availability_log.warning("Availability refresh failed for %s: %s", event_type_uuid, e)
+        time.sleep(AVAILABILITY_REFRESH_SECONDS / 2)
+
+def start_availability_refresher():
+    """Prefetch snapshots for the configured event types and keep them fresh"""
+    global _started
+    if not CALENDLY_API_KEY or not configured_event_types():
+        return
+    with _start_lock:
+        if _started:
+            return
+        add_booking_event_listener(_on_booking_event)
+        threading.Thread(target=_refresh_loop, name='availability-refresher', daemon=True).start()
+        _started = True
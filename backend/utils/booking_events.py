@@ -0,0 +1,233 @@
+import os
+from datetime import datetime, timezone
+from utils.cache import TieredCache
+from utils.log import get_logger
+from utils.promoter_stats import record_bookings_for_users
+from utils.supabase_client import get_supabase_admin
+
+# Bookings are event-sourced: every change is appended to `booking_events`
+# (see sql/003_booking_events.sql) and then applied to the `bookings` table
+# one event at a time. `bookings` is only a materialized view of the log and
+# can be rebuilt from it with rebuild_bookings() (scripts/reconcile_bookings.py
+# --rebuild). Bookings made before the log existed are seeded into it by the
+# migration.
+EVENT_CREATED = 'created'
+EVENT_CANCELED = 'canceled'
+EVENT_RESCHEDULED = 'rescheduled'
+
+BOOKING_EVENT_KINDS = (EVENT_CREATED, EVENT_CANCELED, EVENT_RESCHEDULED)
+
+# Booking status each event kind leaves behind
+BOOKING_STATUS_BY_EVENT = {
+    EVENT_CREATED: 'confirmed',
+    EVENT_CANCELED: 'canceled',
+    EVENT_RESCHEDULED: 'rescheduled'
+}
+
+REBUILD_PAGE_SIZE = 1000
+
+booking_events_log = get_logger('BOOKING_EVENTS')
+
+# Called with each event after it is applied (e.g. the upcoming sessions index)
+_event_listeners = []
+
+def add_booking_event_listener(listener):
+    """Register a callable invoked with every booking event applied in this process"""
+    if listener not in _event_listeners:
+        _event_listeners.append(listener)
+
+def _notify_listeners(event):
+    for listener in _event_listeners:
+        try:
+            listener(event)
+        except Exception as e:
+            booking_events_log.warning("Booking event listener failed: %s", e, exc_info=True)
+
+# Per-user bookings list served by GET /api/bookings. Every write below
+# invalidates the affected user's entry on all workers.
+USER_BOOKINGS_CACHE_TTL_SECONDS = int(os.getenv('USER_BOOKINGS_CACHE_TTL_SECONDS', '30'))
+user_bookings_cache = TieredCache('user_bookings', USER_BOOKINGS_CACHE_TTL_SECONDS, max_entries=2048)
+
+def counts_as_new_booking(event):
+    """Whether an event starts a booking for promoter counters.
+
+    A reschedule creates a new invitee that carries `old_invitee`; it and
+    the rescheduled original count once, as the original."""
+    return event['kind'] != EVENT_RESCHEDULED and not (event.get('details') or {}).get('old_invitee')
+
+def calendly_invitee_id(invitee):
+    """Extract the booking identifier (invitee UUID) from a Calendly invitee"""
+    invitee_uri = invitee.get('uri', '')
+    return invitee_uri.split('/')[-1] if invitee_uri and '/' in invitee_uri else invitee.get('uuid') or None
+
+def apply_booking_event(event):
+    """Apply a single booking event to the bookings table.
+
+    Returns (booking_row, created) where created is True if the event
+    inserted a new booking row."""
+    admin_supabase = get_supabase_admin()
+    kind = event['kind']
+    calendly_event_id = event['calendly_event_id']
+
+    if kind not in BOOKING_EVENT_KINDS:
+        raise ValueError(f"Unknown booking event kind: {kind}")
+
+    if kind == EVENT_CREATED:
+        booking_data = {
+            'user_id': event['user_id'],
+            'calendly_event_id': calendly_event_id,
+            'scheduled_time': event['scheduled_time'],
+            'status': BOOKING_STATUS_BY_EVENT[kind]
+        }
+        # Insert, or fall through to an update if the booking already exists
+        inserted = admin_supabase.table('bookings').upsert(
+            dict(booking_data, created_at=event['occurred_at']),
+            on_conflict='calendly_event_id',
+            ignore_duplicates=True
+        ).execute()
+        user_bookings_cache.invalidate(event['user_id'])
+        if inserted.data:
+            if counts_as_new_booking(event):
+                record_bookings_for_users([event['user_id']])
+            return inserted.data[0], True
+
+        updated = admin_supabase.table('bookings').update(booking_data).eq('calendly_event_id', calendly_event_id).execute()
+        return (updated.data[0] if updated.data else None), False
+
+    updated = admin_supabase.table('bookings').update({
+        'status': BOOKING_STATUS_BY_EVENT[kind]
+    }).eq('calendly_event_id', calendly_event_id).execute()
+    booking = updated.data[0] if updated.data else None
+    if booking:
+        user_bookings_cache.invalidate(booking['user_id'])
+    return booking, False
+
+def record_booking_event(kind, calendly_event_id, user_id=None, scheduled_time=None, source='api', details=None):
+    """Append an event to the booking log and apply it to the bookings table.
+
+    Returns (booking_row, created) as apply_booking_event()."""
+    if kind not in BOOKING_EVENT_KINDS:
+        raise ValueError(f"Unknown booking event kind: {kind}")
+    if not calendly_event_id:
+        raise ValueError("calendly_event_id is required")
+    if kind == EVENT_CREATED and (not user_id or not scheduled_time):
+        raise ValueError("user_id and scheduled_time are required for created events")
+
+    admin_supabase = get_supabase_admin()
+    event = {
+        'kind': kind,
+        'calendly_event_id': calendly_event_id,
+        'user_id': user_id,
+        'scheduled_time': scheduled_time,
+        'source': source,
+        'details': details or {},
+        'occurred_at': datetime.now(timezone.utc).isoformat()
+    }
+    inserted = admin_supabase.table('booking_events').insert(event).execute()
+    if inserted.data:
+        event['id'] = inserted.data[0].get('id')
+    result = apply_booking_event(event)
+    _notify_listeners(event)
+    return result
+
+def record_booking_events_batch(events, source='reconcile'):
+    """Append a batch of events (each with user_id and scheduled_time) and upsert their bookings.
+
+    Used for bulk loads where every event carries the full booking state."""
+    if not events:
+        return 0
+
+    admin_supabase = get_supabase_admin()
+    occurred_at = datetime.now(timezone.utc).isoformat()
+    log_rows = []
+    bookings = {}
+    counted = set()
+    for event in events:
+        if event['kind'] not in BOOKING_EVENT_KINDS:
+            raise ValueError(f"Unknown booking event kind: {event['kind']}")
+        log_rows.append({
+            'kind': event['kind'],
+            'calendly_event_id': event['calendly_event_id'],
+            'user_id': event['user_id'],
+            'scheduled_time': event['scheduled_time'],
+            'source': source,
+            'details': event.get('details') or {},
+            'occurred_at': occurred_at
+        })
+        # Last event wins if an invitee appears twice in the batch
+        bookings[event['calendly_event_id']] = {
+            'user_id': event['user_id'],
+            'calendly_event_id': event['calendly_event_id'],
+            'scheduled_time': event['scheduled_time'],
+            'status': BOOKING_STATUS_BY_EVENT[event['kind']]
+        }
+        if counts_as_new_booking(event):
+            counted.add(event['calendly_event_id'])
+
+    # One lookup per batch to tell new bookings apart for promoter counters
+    existing = admin_supabase.table('bookings').select('calendly_event_id').in_('calendly_event_id', list(bookings)).execute()
+    existing_ids = {row['calendly_event_id'] for row in existing.data or []}
+
+    inserted = admin_supabase.table('booking_events').insert(log_rows).execute()
+    for row, inserted_row in zip(log_rows, inserted.data or []):
+        row['id'] = inserted_row.get('id')
+    admin_supabase.table('bookings').upsert(list(bookings.values()), on_conflict='calendly_event_id').execute()
+    record_bookings_for_users([
+        booking['user_id'] for calendly_event_id, booking in bookings.items()
+        if calendly_event_id in counted and calendly_event_id not in existing_ids
+    ])
+    for user_id in {booking['user_id'] for booking in bookings.values()}:
+        user_bookings_cache.invalidate(user_id)
+    for event in log_rows:
+        _notify_listeners(event)
+    return len(bookings)
+
+def fold_booking_events(events, state=None):
+    """Fold booking events (in log order) into {calendly_event_id: booking}"""
+    state = {} if state is None else state
+    for event in events:
+        calendly_event_id = event['calendly_event_id']
+        booking = state.get(calendly_event_id)
+
+        if event['kind'] == EVENT_CREATED:
+            state[calendly_event_id] = {
+                'user_id': event['user_id'],
+                'calendly_event_id': calendly_event_id,
+                'scheduled_time': event['scheduled_time'],
+                'status': BOOKING_STATUS_BY_EVENT[EVENT_CREATED],
+                'created_at': booking['created_at'] if booking else event['occurred_at']
+            }
+        elif booking:
+            booking['status'] = BOOKING_STATUS_BY_EVENT[event['kind']]
+        elif event.get('user_id') and event.get('scheduled_time'):
+            # Bulk-loaded events carry the full booking state
+            state[calendly_event_id] = {
+                'user_id': event['user_id'],
+                'calendly_event_id': calendly_event_id,
+                'scheduled_time': event['scheduled_time'],
+                'status': BOOKING_STATUS_BY_EVENT[event['kind']],
+                'created_at': event['occurred_at']
+            }
+    return state
+
+def rebuild_bookings(batch_size=500):
+    """Disaster recovery: replay the whole booking log into the bookings table"""
+    admin_supabase = get_supabase_admin()
+    state = {}
+    offset = 0
+
+    while True:
+        page = admin_supabase.table('booking_events').select('*').order('id').range(offset, offset + REBUILD_PAGE_SIZE - 1).execute()
+        events = page.data or []
+        fold_booking_events(events, state)
+        if len(events) < REBUILD_PAGE_SIZE:
+            break
+        offset += REBUILD_PAGE_SIZE
+
+    rows = list(state.values())
+    for start in range(0, len(rows), batch_size):
+        admin_supabase.table('bookings').upsert(rows[start:start + batch_size], on_conflict='calendly_event_id').execute()
+    user_bookings_cache.clear()
+
+    booking_events_log.info("Rebuilt %s bookings from the event log", len(rows))
+    return len(rows)
@@ -0,0 +1,101 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.log import get_logger
+from utils.promoter_stats import record_promoter_event, remember_user_promoter
+from utils.supabase_client import get_supabase_admin
+from utils.user_lookup import normalize_email, remember_user_email
+
+# Cohort onboarding: auth users are created concurrently within a chunk
+# (GoTrue has no bulk endpoint), then the chunk's profiles are inserted in
+# one request and promoter counters are bumped once per promoter code.
+BULK_REGISTRATION_CHUNK_SIZE = int(os.getenv('BULK_REGISTRATION_CHUNK_SIZE', '50'))
+BULK_REGISTRATION_WORKERS = int(os.getenv('BULK_REGISTRATION_WORKERS', '8'))
+
+bulk_log = get_logger('BULK_REGISTER')
+
+def _create_auth_user(entry):
+    attributes = {
+        'email': entry['email'],
+        'email_confirm': entry.get('email_confirm', False),
+        # Kept on the auth user in case its profile insert fails
+        'user_metadata': {'full_name': entry['full_name'], 'promoter_code': entry.get('promoter_code')}
+    }
+    if entry.get('password'):
+        attributes['password'] = entry['password']
+    try:
+        response = get_supabase_admin().auth.admin.create_user(attributes)
+        return entry, response.user.id, None
+    except Exception as e:
+        return entry, None, str(e)
+
+def register_users_bulk(entries, chunk_size=BULK_REGISTRATION_CHUNK_SIZE):
+    """Create auth users and profiles for a cohort.
+
+    Each entry needs email and full_name; password, promoter_code and
+    email_confirm are optional. Returns one result per entry, in order:
+    {'email', 'user_id'} on success or {'email', 'error'} on failure
+    (with 'user_id' too if the auth user exists but its profile does not)."""
+    # Validate everything before creating anyone
+    results = [None] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results[index] = {'email': None, 'error': 'each user must be an object'}
+            continue
+        email = normalize_email(entry.get('email')) if isinstance(entry.get('email'), str) else None
+        if not email or not entry.get('full_name'):
+            results[index] = {'email': entry.get('email'), 'error': 'email and full_name are required'}
+            continue
+        valid.append((index, dict(entry, email=email)))
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+
+        with ThreadPoolExecutor(max_workers=BULK_REGISTRATION_WORKERS) as executor:
+            created = list(executor.map(lambda item: (item[0],) + _create_auth_user(item[1]), chunk))
+
+        profiles = []
+        indexes = []
+        for index, entry, user_id, error in created:
+            if error:
+                results[index] = {'email': entry['email'], 'error': error}
+                continue
+            indexes.append(index)
+            profiles.append({
+                'id': user_id,
+                'email': entry['email'],
+                'full_name': entry['full_name'],
+                'promoter_code': entry.get('promoter_code'),
+                'survey_completed': False
+            })
+
+        if not profiles:
+            continue
+
+        try:
+            get_supabase_admin().table('users').insert(profiles).execute()
+        except Exception as e:
+            # Auth users exist without a profile; keep the promoter code so
+            # the profile can be created with it
+            bulk_log.warning("Profile insert failed for %s users: %s", len(profiles), e)
+            for index, profile in zip(indexes, profiles):
+                results[index] = {
+                    'email': profile['email'],
+                    'user_id': profile['id'],
+                    'promoter_code': profile['promoter_code'],
+                    'error': 'profile not created'
+                }
+            continue
+
+        for index, profile in zip(indexes, profiles):
+            remember_user_email(profile['email'], profile['id'])
+            remember_user_promoter(profile['id'], profile['promoter_code'])
+            results[index] = {'email': profile['email'], 'user_id': profile['id']}
+
+        for promoter_code, count in Counter(profile['promoter_code'] for profile in profiles).items():
+            record_promoter_event(promoter_code, signups=count)
+
+        bulk_log.info("Registered %s users (%s/%s processed)", len(profiles), min(start + chunk_size, len(valid)), len(valid))
+
+    return results
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from utils.log import get_logger
+
+# Two-tier cache shared by every worker process on a host:
+#   - an in-process LRU tier (no I/O on hits)
+#   - a local SQLite (WAL) tier that all workers read and write
+# Invalidations are written to the shared tier and replayed into every
+# worker's memory tier within CACHE_SYNC_INTERVAL_SECONDS.
+#
+# CACHE_BACKEND=memory disables the shared tier (e.g. single worker setups
+# or read-only filesystems).
+#
+# The shared tier holds auth and profile data, so by default it lives in a
+# private (0700) directory next to the app, in a 0600 file named after the
+# Supabase project - deployments on the same host never share it.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'))
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH')
+CACHE_SYNC_INTERVAL_SECONDS = float(os.getenv('CACHE_SYNC_INTERVAL_SECONDS', '0.5'))
+CACHE_MAINTENANCE_EVERY = 200
+INVALIDATION_RETENTION_SECONDS = 600
+
+_MISSING = object()
+
+cache_log = get_logger('CACHE')
+
+def default_cache_db_path():
+    project = hashlib.sha256((os.getenv('SUPABASE_URL') or '').encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f'cache-{project}.sqlite3')
+
+def _create_private_file(path):
+    """Create path (and its directory) readable by this user only; SQLite
+    gives the -wal/-shm files the same permissions as the database."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+
+class SharedStore:
+    """SQLite-backed cache tier shared between worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        _create_private_file(path)
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript("""
+            create table if not exists cache_entries (
+                namespace text not null,
+                key text not null,
+                value text not null,
+                expires_at real not null,
+                primary key (namespace, key)
+            );
+            create index if not exists cache_entries_expires_at_idx on cache_entries (namespace, expires_at);
+            create table if not exists cache_invalidations (
+                seq integer primary key autoincrement,
+                namespace text not null,
+                key text,
+                created_at real not null
+            );
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('pragma journal_mode=wal')
+            conn.execute('pragma synchronous=normal')
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._connection().execute(
+            'select value, expires_at from cache_entries where namespace = ? and key = ? and expires_at > ?',
+            (namespace, key, time.time())
+        ).fetchone()
+        if row is None:
+            return _MISSING, 0
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, expires_at, max_entries):
+        conn = self._connection()
+        conn.execute(
+            'insert or replace into cache_entries (namespace, key, value, expires_at) values (?, ?, ?, ?)',
+            (namespace, key, json.dumps(value, default=str), expires_at)
+        )
+        with self._lock:
+            self._writes += 1
+            run_maintenance = self._writes % CACHE_MAINTENANCE_EVERY == 0
+        if run_maintenance:
+            self._evict(namespace, max_entries)
+
+    def _evict(self, namespace, max_entries):
+        """Drop expired entries and trim the namespace to max_entries (soonest-expiring first)"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute('delete from cache_entries where expires_at <= ?', (now,))
+        conn.execute(
+            'delete from cache_entries where namespace = ? and key in ('
+            'select key from cache_entries where namespace = ? order by expires_at desc limit -1 offset ?)',
+            (namespace, namespace, max_entries)
+        )
+        conn.execute('delete from cache_invalidations where created_at < ?', (now - INVALIDATION_RETENTION_SECONDS,))
+
+    def invalidate(self, namespace, key=None):
+        conn = self._connection()
+        if key is None:
+            conn.execute('delete from cache_entries where namespace = ?', (namespace,))
+        else:
+            conn.execute('delete from cache_entries where namespace = ? and key = ?', (namespace, key))
+        conn.execute(
+            'insert into cache_invalidations (namespace, key, created_at) values (?, ?, ?)',
+            (namespace, key, time.time())
+        )
+
+    def last_invalidation(self):
+        row = self._connection().execute('select max(seq) from cache_invalidations').fetchone()
+        return row[0] or 0
+
+    def invalidations_since(self, namespace, seq):
+        return self._connection().execute(
+            'select seq, key from cache_invalidations where namespace = ? and seq > ? order by seq',
+            (namespace, seq)
+        ).fetchall()
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_shared_store():
+    """Return the per-host shared store, or None if the shared tier is disabled or unavailable"""
+    global _shared_store
+    if CACHE_BACKEND != 'sqlite':
+        return None
+
+    with _shared_store_lock:
+        if _shared_store is None:
+            path = CACHE_DB_PATH or default_cache_db_path()
+            try:
+                _shared_store = SharedStore(path)
+            except (sqlite3.Error, OSError) as e:
+                cache_log.warning("Shared cache unavailable at %s, using memory only: %s", path, e)
+                _shared_store = False
+        return _shared_store or None
+
+class TieredCache:
+    """Namespaced cache with an in-memory LRU tier in front of the shared SQLite tier"""
+
+    def __init__(self, namespace, ttl_seconds, max_entries=1024, shared_max_entries=None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared_max_entries = shared_max_entries or max_entries * 10
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = _MISSING
+        self._last_sync = 0.0
+        self._last_seq = None
+
+    def _shared(self):
+        if self._store is _MISSING:
+            self._store = get_shared_store()
+            if self._store is not None:
+                self._last_seq = self._store.last_invalidation()
+        return self._store
+
+    def _sync_invalidations(self, store):
+        """Replay invalidations issued by other workers into the memory tier"""
+        now = time.monotonic()
+        if now - self._last_sync < CACHE_SYNC_INTERVAL_SECONDS:
+            return
+        self._last_sync = now
+
+        rows = store.invalidations_since(self.namespace, self._last_seq)
+        if not rows:
+            return
+        with self._lock:
+            for seq, key in rows:
+                if key is None:
+                    self._entries.clear()
+                else:
+                    self._entries.pop(key, None)
+            self._last_seq = rows[-1][0]
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default"""
+        store = self._shared()
+        if store is not None:
+            try:
+                self._sync_invalidations(store)
+            except sqlite3.Error as e:
+                cache_log.warning("Invalidation sync failed for %s: %s", self.namespace, e)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+
+        if store is None:
+            return default
+
+        try:
+            value, expires_at = store.get(self.namespace, key)
+        except sqlite3.Error as e:
+            cache_log.warning("Shared read failed for %s: %s", self.namespace, e)
+            return default
+        if value is _MISSING:
+            return default
+
+        self._remember(key, value, expires_at)
+        return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store a JSON-serializable value in both tiers"""
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        self._remember(key, value, expires_at)
+
+        store = self._shared()
+        if store is not None:
+            try:
+                store.set(self.namespace, key, value, expires_at, self.shared_max_entries)
+            except sqlite3.Error as e:
+                cache_log.warning("Shared write failed for %s: %s", self.namespace, e)
+
+    def invalidate(self, key):
+        """Remove key from this worker and from every other worker on the host"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        store = self._shared()
+        if store is not None:
+            try:
+                store.invalidate(self.namespace, key)
+            except sqlite3.Error as e:
+                cache_log.warning("Shared invalidation failed for %s: %s", self.namespace, e)
+
+    def clear(self):
+        """Remove every entry in the namespace on every worker"""
+        with self._lock:
+            self._entries.clear()
+
+        store = self._shared()
+        if store is not None:
+            try:
+                store.invalidate(self.namespace)
+            except sqlite3.Error as e:
+                cache_log.warning("Shared clear failed for %s: %s", self.namespace, e)
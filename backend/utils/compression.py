@@ -0,0 +1,61 @@
+import gzip
+import os
+from flask import request
+
+# Brotli is optional - without it responses are only gzip-compressed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '5'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+def choose_encoding(accept_encodings):
+    """Pick the best supported content encoding from an Accept-Encoding header, or None"""
+    candidates = []
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        candidates.append(('br', accept_encodings.quality('br')))
+    if accept_encodings.quality('gzip') > 0:
+        candidates.append(('gzip', accept_encodings.quality('gzip')))
+    if not candidates:
+        return None
+
+    # Highest client preference wins; ties go to brotli (listed first)
+    return max(candidates, key=lambda candidate: candidate[1])[0]
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+def compress_response(response):
+    """Compress eligible responses according to the request's Accept-Encoding"""
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_compression(app):
+    """Register response compression on the Flask app"""
+    app.after_request(compress_response)
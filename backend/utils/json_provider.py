@@ -0,0 +1,55 @@
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional - without it the provider behaves exactly like Flask's
+# default standard-library provider.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed"""
+
+    def _orjson_options(self, indent=False):
+        # Dates and dataclasses go through Flask's default() so the output
+        # matches the standard provider (e.g. RFC 822 dates)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _orjson_dumps(self, obj, indent=False):
+        """Encode obj to bytes with orjson, or None if orjson can't handle it"""
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except TypeError:
+            # e.g. non-string dict keys - leave it to the standard library
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+
+        encoded = self._orjson_dumps(obj)
+        if encoded is None:
+            return super().dumps(obj)
+        return encoded.decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._orjson_dumps(obj, indent=indent)
+        if encoded is None:
+            return super().response(obj)
+
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Backend logging: every category logger ("BOOKINGS", "WEBHOOK", ...) hands
+# records to a bounded in-memory queue; a background listener thread formats
+# and writes them, so request threads never block on stdout.
+#
+#   LOG_LEVEL=INFO                          default level for all categories
+#   LOG_LEVELS=BOOKINGS=WARNING,WEBHOOK=DEBUG   per-category overrides
+#   LOG_SAMPLE_RATES=BOOKINGS=0.1           keep ~10% of INFO/DEBUG records
+#   LOG_FORMAT=text|json
+#   LOG_QUEUE_SIZE=10000                    records beyond this are dropped
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+ROOT_LOGGER_NAME = 'backend'
+
+def _parse_mapping(value):
+    mapping = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            mapping[name.strip().upper()] = setting.strip()
+    return mapping
+
+LOG_LEVELS = {name: level.upper() for name, level in _parse_mapping(os.getenv('LOG_LEVELS')).items()}
+LOG_SAMPLE_RATES = {name: float(rate) for name, rate in _parse_mapping(os.getenv('LOG_SAMPLE_RATES')).items()}
+
+class LazyJson:
+    """Defer json.dumps of a payload until the record is actually formatted"""
+
+    __slots__ = ('obj', 'indent')
+
+    def __init__(self, obj, indent=None):
+        self.obj = obj
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.obj, indent=self.indent, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+class BackgroundQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and drops records when full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting (including LazyJson payloads and tracebacks) happens in
+        # the listener thread; the record is only handed over here.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            BackgroundQueueHandler.dropped += 1
+
+class TextFormatter(logging.Formatter):
+    """[CATEGORY] message key=value ... ([CATEGORY WARNING] / [CATEGORY ERROR] above INFO)"""
+
+    def format(self, record):
+        tag = record.category if record.levelno < logging.WARNING else f"{record.category} {record.levelname}"
+        line = f"[{tag}] {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'category': record.category,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class CategoryAdapter(logging.LoggerAdapter):
+    """Attach the category and structured fields (fields={...}) to every record"""
+
+    def process(self, msg, kwargs):
+        extra = kwargs.setdefault('extra', {})
+        extra['category'] = self.extra['category']
+        if 'fields' in kwargs:
+            extra['fields'] = kwargs.pop('fields')
+        return msg, kwargs
+
+_listener = None
+_setup_lock = threading.Lock()
+
+def _setup():
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(BackgroundQueueHandler(log_queue))
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+def get_logger(category):
+    """Return the logger for a category, e.g. get_logger('BOOKINGS')"""
+    _setup()
+    category = category.upper()
+    logger = logging.getLogger(f"{ROOT_LOGGER_NAME}.{category}")
+
+    if category in LOG_LEVELS:
+        logger.setLevel(LOG_LEVELS[category])
+    if category in LOG_SAMPLE_RATES and not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(LOG_SAMPLE_RATES[category]))
+
+    return CategoryAdapter(logger, {'category': category})
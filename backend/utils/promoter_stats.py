@@ -0,0 +1,91 @@
+import os
+from collections import Counter
+from utils.cache import TieredCache
+from utils.log import get_logger
+from utils.supabase_client import get_supabase_admin
+
+# Promoter attribution counters live in `promoter_stats` (see
+# sql/005_promoter_stats.sql) and are bumped atomically through the
+# increment_promoter_stats() function as signups, survey completions and
+# new bookings happen, so reporting never scans `users`.
+PROMOTER_STATS_CACHE_TTL_SECONDS = int(os.getenv('PROMOTER_STATS_CACHE_TTL_SECONDS', '60'))
+USER_PROMOTER_CACHE_TTL_SECONDS = int(os.getenv('USER_PROMOTER_CACHE_TTL_SECONDS', '3600'))
+
+promoter_stats_cache = TieredCache('promoter_stats', PROMOTER_STATS_CACHE_TTL_SECONDS, max_entries=512)
+# user id -> promoter code ('' when the user has none)
+user_promoter_cache = TieredCache('user_promoter', USER_PROMOTER_CACHE_TTL_SECONDS, max_entries=8192)
+
+promoter_log = get_logger('PROMOTER')
+
+def record_promoter_event(promoter_code, signups=0, surveys_completed=0, bookings=0):
+    """Add to a promoter's counters. Failures are logged, never raised."""
+    if not promoter_code:
+        return
+
+    try:
+        get_supabase_admin().rpc('increment_promoter_stats', {
+            'p_promoter_code': promoter_code,
+            'p_signups': signups,
+            'p_surveys_completed': surveys_completed,
+            'p_bookings': bookings
+        }).execute()
+        promoter_stats_cache.invalidate(promoter_code)
+    except Exception as e:
+        promoter_log.warning("Failed to update counters for %s: %s", promoter_code, e)
+
+def remember_user_promoter(user_id, promoter_code):
+    user_promoter_cache.set(user_id, promoter_code or '')
+
+def get_user_promoter_codes(user_ids):
+    """Return {user_id: promoter code or None}, fetching uncached users in one query"""
+    promoter_codes = {}
+    uncached = []
+    for user_id in set(user_ids):
+        promoter_code = user_promoter_cache.get(user_id)
+        if promoter_code is None:
+            uncached.append(user_id)
+        else:
+            promoter_codes[user_id] = promoter_code or None
+
+    if uncached:
+        result = get_supabase_admin().table('users').select('id, promoter_code').in_('id', uncached).execute()
+        found = {row['id']: row.get('promoter_code') or '' for row in result.data or []}
+        for user_id in uncached:
+            remember_user_promoter(user_id, found.get(user_id))
+            promoter_codes[user_id] = found.get(user_id) or None
+    return promoter_codes
+
+def record_bookings_for_users(user_ids):
+    """Count new bookings (one per entry in user_ids) against their users' promoters"""
+    if not user_ids:
+        return
+
+    try:
+        promoter_codes = get_user_promoter_codes(user_ids)
+        by_promoter = Counter(promoter_codes[user_id] for user_id in user_ids)
+    except Exception as e:
+        promoter_log.warning("Failed to resolve promoter codes for bookings: %s", e)
+        return
+
+    for promoter_code, count in by_promoter.items():
+        record_promoter_event(promoter_code, bookings=count)
+
+def get_promoter_stats(promoter_code):
+    """Return the counters for one promoter (zeros if it has none yet)"""
+    stats = promoter_stats_cache.get(promoter_code)
+    if stats is None:
+        result = get_supabase_admin().table('promoter_stats').select('*').eq('promoter_code', promoter_code).limit(1).execute()
+        stats = result.data[0] if result.data else {
+            'promoter_code': promoter_code,
+            'signups': 0,
+            'surveys_completed': 0,
+            'bookings': 0,
+            'updated_at': None
+        }
+        promoter_stats_cache.set(promoter_code, stats)
+    return stats
+
+def list_promoter_stats():
+    """Return the counters for every promoter, most signups first"""
+    result = get_supabase_admin().table('promoter_stats').select('*').order('signups', desc=True).execute()
+    return result.data or []
@@ -1,8 +1,31 @@
-from supabase import create_client
+from types import SimpleNamespace
+from utils.cache import TieredCache
+import base64
+import hashlib
+import json
 import os
+import threading
+import time
+
+# `supabase` (and httpx/postgrest behind it) is the heaviest import in the
+# backend, so it is imported on first use rather than when workers boot.
+# No client is created at import time; call warm_up() in app.py to do it
+# ahead of the first request.
+
+AUTH_TOKEN_CACHE_TTL_SECONDS = int(os.getenv('AUTH_TOKEN_CACHE_TTL_SECONDS', '60'))
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv('PROFILE_CACHE_TTL_SECONDS', '300'))
+
+# Shared across workers on the host (see utils/cache.py). Tokens are keyed by
+# their SHA-256 so raw tokens never reach the shared tier.
+token_cache = TieredCache('auth_tokens', AUTH_TOKEN_CACHE_TTL_SECONDS, max_entries=4096)
+profile_cache = TieredCache('profiles', PROFILE_CACHE_TTL_SECONDS, max_entries=4096)
+
+_admin_client = None
+_admin_client_lock = threading.Lock()
 
 def get_supabase():
     """Get Supabase client, initializing it lazily"""
+    from supabase import create_client
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_KEY")
     
@@ -13,16 +36,15 @@ def get_supabase():
     
     return create_client(supabase_url, supabase_key)
 
-# For backward compatibility, create client at module level
-# but it will be recreated if env vars are loaded later
-try:
-    supabase = get_supabase()
-except ValueError:
-    # If env vars not loaded yet, create a placeholder that will fail with a clear error
-    supabase = None
-
 def get_supabase_admin():
-    """Get admin client for server-side operations"""
+    """Get admin client for server-side operations.
+
+    The service-role client holds no user session, so one instance (and its
+    connection pool) is shared by every request in the process."""
+    global _admin_client
+    if _admin_client is not None:
+        return _admin_client
+
     from supabase import create_client
     supabase_url = os.getenv("SUPABASE_URL")
     service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -32,4 +54,41 @@ def get_supabase_admin():
             "Supabase admin credentials not found. Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY in your .env file."
         )
     
-    return create_client(supabase_url, service_role_key)
+    with _admin_client_lock:
+        if _admin_client is None:
+            _admin_client = create_client(supabase_url, service_role_key)
+    return _admin_client
+
+def _token_expiry(token):
+    """The `exp` claim of a JWT, or None. The signature is not checked here;
+    Supabase verifies the token before anything is cached."""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except Exception:
+        return None
+
+def get_authenticated_user(token):
+    """Resolve an access token to its user (id, email), or None if the token is invalid"""
+    if not token:
+        return None
+
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user = token_cache.get(key)
+    if user:
+        return SimpleNamespace(**user)
+
+    response = get_supabase().auth.get_user(token)
+    if not response or not response.user:
+        return None
+
+    user = {'id': response.user.id, 'email': response.user.email}
+    # Never serve a token from the cache past its own expiry
+    ttl_seconds = AUTH_TOKEN_CACHE_TTL_SECONDS
+    expires_at = _token_expiry(token)
+    if expires_at is not None:
+        ttl_seconds = min(ttl_seconds, expires_at - time.time())
+    if ttl_seconds > 0:
+        token_cache.set(key, user, ttl_seconds=ttl_seconds)
+    return SimpleNamespace(**user)
@@ -0,0 +1,132 @@
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import secrets
+import time
+from logging.handlers import QueueListener
+from flask import g, request
+from utils.log import BackgroundQueueHandler
+
+# Opt-in capture of request shapes for scripts/replay_traffic.py. Set
+# TRAFFIC_CAPTURE_PATH to append one JSON object per request:
+#
+#   ts     request start (epoch seconds)
+#   m, r   method and URL rule template (e.g. /api/surveys/<user_id>)
+#   s, ms  response status and handling time in milliseconds
+#   n      response body size in bytes
+#   q      query parameter names
+#   k      top-level JSON body keys
+#   ev     the body's `event` field (Calendly webhook event type)
+#   u      client key: HMAC of the Authorization header with the capture
+#          salt, so clients can be told apart within a capture (across all
+#          workers) but not identified
+#
+# The salt comes from TRAFFIC_CAPTURE_SALT, or is generated by the first
+# worker into TRAFFIC_CAPTURE_PATH + '.salt' (mode 0600) and read by the
+# rest. Keep the salt file away from shared captures, and delete it to
+# start a new, unlinkable capture.
+#
+# No header values, parameter values, path values or bodies are written.
+TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', '1.0'))
+TRAFFIC_CAPTURE_QUEUE_SIZE = int(os.getenv('TRAFFIC_CAPTURE_QUEUE_SIZE', '10000'))
+
+_client_salt = None
+_capture_logger = logging.getLogger('traffic_capture')
+_capture_logger.propagate = False
+
+def _load_salt(capture_path):
+    """Return the salt shared by every worker writing capture_path"""
+    if os.getenv('TRAFFIC_CAPTURE_SALT'):
+        return os.getenv('TRAFFIC_CAPTURE_SALT').encode()
+
+    salt_path = capture_path + '.salt'
+    if not os.path.exists(salt_path):
+        # Write a private temp file and link it into place; link() fails if
+        # another worker won the race, in which case its salt is used.
+        temp_path = f"{salt_path}.{os.getpid()}"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as salt_file:
+            salt_file.write(secrets.token_hex(16))
+        try:
+            os.link(temp_path, salt_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_path)
+
+    with open(salt_path, encoding='utf-8') as salt_file:
+        return salt_file.read().strip().encode()
+
+def client_key(authorization):
+    if not authorization or _client_salt is None:
+        return None
+    return hmac.new(_client_salt, authorization.encode(), hashlib.sha256).hexdigest()[:12]
+
+def request_shape(response, started, duration_ms):
+    """Anonymized description of the current request"""
+    shape = {
+        'ts': round(started, 3),
+        'm': request.method,
+        'r': request.url_rule.rule if request.url_rule else None,
+        's': response.status_code,
+        'ms': round(duration_ms, 2),
+        'n': response.calculate_content_length() or 0
+    }
+    if request.args:
+        shape['q'] = sorted(request.args.keys())
+    body = request.get_json(silent=True) if request.is_json else None
+    if isinstance(body, dict):
+        shape['k'] = sorted(body.keys())
+        if isinstance(body.get('event'), str):
+            shape['ev'] = body['event'][:64]
+    key = client_key(request.headers.get('Authorization'))
+    if key:
+        shape['u'] = key
+    return shape
+
+def _start_capture():
+    if TRAFFIC_CAPTURE_SAMPLE_RATE < 1.0 and secrets.randbelow(1_000_000) >= TRAFFIC_CAPTURE_SAMPLE_RATE * 1_000_000:
+        return
+    g.capture_started = time.time()
+    g.capture_started_perf = time.perf_counter()
+
+def _capture_response(response):
+    started = g.pop('capture_started', None)
+    if started is None:
+        return response
+    duration_ms = (time.perf_counter() - g.pop('capture_started_perf')) * 1000
+    try:
+        _capture_logger.info(json.dumps(request_shape(response, started, duration_ms), separators=(',', ':')))
+    except Exception:
+        pass
+    return response
+
+def init_traffic_capture(app):
+    """Record request shapes when TRAFFIC_CAPTURE_PATH is set.
+
+    Register before compression so the hook runs last (after_request hooks
+    run in reverse) and sees the final response size."""
+    global _client_salt
+    if not TRAFFIC_CAPTURE_PATH:
+        return
+
+    _client_salt = _load_salt(TRAFFIC_CAPTURE_PATH)
+
+    # Written by a background thread; records are dropped if the writer falls behind
+    file_handler = logging.FileHandler(TRAFFIC_CAPTURE_PATH, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    capture_queue = queue.Queue(TRAFFIC_CAPTURE_QUEUE_SIZE)
+    _capture_logger.addHandler(BackgroundQueueHandler(capture_queue))
+    _capture_logger.setLevel(logging.INFO)
+    listener = QueueListener(capture_queue, file_handler)
+    listener.start()
+    # Flush queued lines on shutdown
+    atexit.register(listener.stop)
+
+    app.before_request(_start_capture)
+    app.after_request(_capture_response)
@@ -0,0 +1,368 @@
+import bisect
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from utils.booking_events import EVENT_CREATED, add_booking_event_listener
+from utils.log import get_logger
+from utils.supabase_client import get_supabase_admin
+
+# In-process, time-ordered view of confirmed future bookings. The index is a
+# sorted list of (scheduled_ts, calendly_event_id) so window queries are a
+# bisect plus the matching slice. It is loaded once from `bookings`, updated
+# directly by booking writes in this process and caught up with other
+# workers' writes by reading new `booking_events` rows - on demand for the
+# admin endpoint, and every UPCOMING_SYNC_INTERVAL_SECONDS only while the
+# reminder dispatcher (REMINDERS_ENABLED) depends on it.
+UPCOMING_SYNC_INTERVAL_SECONDS = float(os.getenv('UPCOMING_SYNC_INTERVAL_SECONDS', '30'))
+# Identity values can commit out of order; events this recent are re-read on
+# every sync (and skipped if already applied) so a late commit isn't missed
+UPCOMING_SYNC_LOOKBACK_SECONDS = float(os.getenv('UPCOMING_SYNC_LOOKBACK_SECONDS', '120'))
+# Sessions stay in the index this long after their start time
+UPCOMING_RETENTION_SECONDS = int(os.getenv('UPCOMING_RETENTION_SECONDS', '3600'))
+UPCOMING_PAGE_SIZE = 1000
+
+# Reminders go out this many minutes before a session, e.g. "1440,60"
+REMINDER_LEAD_MINUTES = tuple(
+    int(minutes) for minutes in os.getenv('REMINDER_LEAD_MINUTES', '1440,60').split(',') if minutes.strip()
+)
+REMINDERS_ENABLED = os.getenv('REMINDERS_ENABLED', 'false').lower() == 'true'
+# Delay before retrying a reminder whose claim failed for a reason other than a duplicate
+REMINDER_RETRY_SECONDS = float(os.getenv('REMINDER_RETRY_SECONDS', '30'))
+# Postgres unique_violation: the reminder was already claimed
+UNIQUE_VIOLATION = '23505'
+
+upcoming_log = get_logger('UPCOMING')
+reminder_log = get_logger('REMINDER')
+
+def _parse_time(scheduled_time):
+    if isinstance(scheduled_time, datetime):
+        value = scheduled_time
+    else:
+        value = datetime.fromisoformat(str(scheduled_time).replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+class UpcomingSessionsIndex:
+    """Confirmed bookings ordered by start time"""
+
+    def __init__(self, retention_seconds=UPCOMING_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._order = []  # sorted (scheduled_ts, calendly_event_id)
+        self._sessions = {}  # calendly_event_id -> session
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.last_event_id = 0
+        self.loaded = False
+        # Ids applied above the sync floor, and (time, last_event_id) marks
+        # used to find that floor
+        self._applied_ids = set()
+        self._watermarks = []
+        self._floor_event_id = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, calendly_event_id):
+        session = self._sessions.get(calendly_event_id)
+        return dict(session) if session else None
+
+    def add_listener(self, listener):
+        """Register a callable invoked with (session, removed) on every change"""
+        self._listeners.append(listener)
+
+    def _notify(self, session, removed):
+        for listener in self._listeners:
+            try:
+                listener(session, removed)
+            except Exception as e:
+                upcoming_log.warning("Upcoming sessions listener failed: %s", e, exc_info=True)
+
+    def upsert(self, calendly_event_id, user_id, scheduled_time):
+        """Add a confirmed session, or move it if its time changed"""
+        scheduled = _parse_time(scheduled_time)
+        scheduled_ts = scheduled.timestamp()
+        if scheduled_ts < time.time() - self.retention_seconds:
+            self.remove(calendly_event_id)
+            return
+
+        # Normalized so 'Z' and '+00:00' spellings of one time compare equal
+        session = {
+            'calendly_event_id': calendly_event_id,
+            'user_id': user_id,
+            'scheduled_time': scheduled.astimezone(timezone.utc).isoformat(),
+            'scheduled_ts': scheduled_ts
+        }
+        with self._lock:
+            current = self._sessions.get(calendly_event_id)
+            if current == session:
+                return
+            if current:
+                self._order.pop(bisect.bisect_left(self._order, (current['scheduled_ts'], calendly_event_id)))
+            bisect.insort(self._order, (scheduled_ts, calendly_event_id))
+            self._sessions[calendly_event_id] = session
+        self._notify(session, False)
+
+    def remove(self, calendly_event_id):
+        with self._lock:
+            session = self._sessions.pop(calendly_event_id, None)
+            if session:
+                self._order.pop(bisect.bisect_left(self._order, (session['scheduled_ts'], calendly_event_id)))
+        if session:
+            self._notify(session, True)
+
+    def prune(self, now=None):
+        """Drop sessions that started more than retention_seconds ago"""
+        cutoff = (now or time.time()) - self.retention_seconds
+        with self._lock:
+            end = bisect.bisect_left(self._order, (cutoff,))
+            expired = self._order[:end]
+            del self._order[:end]
+            for _, calendly_event_id in expired:
+                self._sessions.pop(calendly_event_id, None)
+        return len(expired)
+
+    def between(self, start_ts, end_ts, limit=None):
+        """Sessions starting in [start_ts, end_ts), earliest first"""
+        with self._lock:
+            start = bisect.bisect_left(self._order, (start_ts,))
+            end = bisect.bisect_left(self._order, (end_ts,))
+            if limit is not None:
+                end = min(end, start + limit)
+            return [dict(self._sessions[calendly_event_id]) for _, calendly_event_id in self._order[start:end]]
+
+    def next_hours(self, hours, now=None, limit=None):
+        """Sessions starting within the next `hours` hours"""
+        now = now or time.time()
+        return self.between(now, now + hours * 3600, limit)
+
+    def apply_event(self, event):
+        """Apply a booking event (see utils.booking_events), once per event id"""
+        event_id = event.get('id')
+        if event_id:
+            with self._lock:
+                if event_id in self._applied_ids:
+                    return
+                self._applied_ids.add(event_id)
+                self.last_event_id = max(self.last_event_id, event_id)
+
+        if event['kind'] == EVENT_CREATED and event.get('scheduled_time'):
+            self.upsert(event['calendly_event_id'], event.get('user_id'), event['scheduled_time'])
+        else:
+            self.remove(event['calendly_event_id'])
+
+    def load(self):
+        """Load confirmed bookings that have not started yet"""
+        admin_supabase = get_supabase_admin()
+        # Read the log position first so nothing written during the load is
+        # missed; the first syncs re-read the lookback window below it
+        latest = admin_supabase.table('booking_events').select('id').order('id', desc=True).limit(1).execute()
+        last_event_id = latest.data[0]['id'] if latest.data else 0
+        recent_since = datetime.fromtimestamp(time.time() - UPCOMING_SYNC_LOOKBACK_SECONDS, timezone.utc).isoformat()
+        recent = admin_supabase.table('booking_events').select('id').gte(
+            'occurred_at', recent_since
+        ).order('id').limit(1).execute()
+        floor_event_id = recent.data[0]['id'] - 1 if recent.data else last_event_id
+
+        since = datetime.fromtimestamp(time.time() - self.retention_seconds, timezone.utc).isoformat()
+        offset = 0
+        while True:
+            page = admin_supabase.table('bookings').select('calendly_event_id, user_id, scheduled_time').eq(
+                'status', 'confirmed'
+            ).gte('scheduled_time', since).order('scheduled_time').range(offset, offset + UPCOMING_PAGE_SIZE - 1).execute()
+            rows = page.data or []
+            for row in rows:
+                self.upsert(row['calendly_event_id'], row['user_id'], row['scheduled_time'])
+            if len(rows) < UPCOMING_PAGE_SIZE:
+                break
+            offset += UPCOMING_PAGE_SIZE
+
+        self.last_event_id = max(self.last_event_id, last_event_id)
+        with self._lock:
+            self._floor_event_id = max(self._floor_event_id, min(floor_event_id, last_event_id))
+            self._watermarks.append((time.time(), self.last_event_id))
+        self.loaded = True
+        upcoming_log.info("Loaded %s upcoming sessions", len(self))
+
+    def _advance_floor(self, now):
+        """Move the floor to the last event id seen UPCOMING_SYNC_LOOKBACK_SECONDS ago"""
+        with self._lock:
+            while self._watermarks and self._watermarks[0][0] <= now - UPCOMING_SYNC_LOOKBACK_SECONDS:
+                self._floor_event_id = max(self._floor_event_id, self._watermarks.pop(0)[1])
+            self._applied_ids = {event_id for event_id in self._applied_ids if event_id > self._floor_event_id}
+            return self._floor_event_id
+
+    def sync(self):
+        """Apply booking events written by other workers since the last sync"""
+        admin_supabase = get_supabase_admin()
+        now = time.time()
+        after_id = self._advance_floor(now)
+        applied = 0
+        while True:
+            page = admin_supabase.table('booking_events').select('id, kind, calendly_event_id, user_id, scheduled_time').gt(
+                'id', after_id
+            ).order('id').limit(UPCOMING_PAGE_SIZE).execute()
+            events = page.data or []
+            for event in events:
+                self.apply_event(event)
+            applied += len(events)
+            if len(events) < UPCOMING_PAGE_SIZE:
+                break
+            after_id = events[-1]['id']
+        with self._lock:
+            self._watermarks.append((now, self.last_event_id))
+        self.prune()
+        return applied
+
+class ReminderDispatcher:
+    """Fires reminder handlers ahead of each upcoming session.
+
+    Reminders sit in a heap keyed by due time and a single thread sleeps until
+    the earliest one, so nothing polls the database. Each reminder is claimed
+    with an insert into `booking_reminders` (see sql/006_booking_reminders.sql)
+    so only one worker sends it."""
+
+    def __init__(self, index, lead_minutes=REMINDER_LEAD_MINUTES):
+        self.index = index
+        self.lead_minutes = lead_minutes
+        self._heap = []  # (due_ts, calendly_event_id, lead_minutes, scheduled_ts)
+        self._condition = threading.Condition()
+        self._handlers = []
+        self._thread = None
+        self._stopped = False
+
+    def add_handler(self, handler):
+        """Register a callable invoked with (session, lead_minutes) for each reminder"""
+        self._handlers.append(handler)
+
+    def _on_session_change(self, session, removed):
+        # Removed or moved sessions leave stale heap entries behind; they are
+        # skipped when they come due.
+        if removed:
+            return
+        now = time.time()
+        with self._condition:
+            earliest = self._heap[0][0] if self._heap else None
+            for lead in self.lead_minutes:
+                due_ts = session['scheduled_ts'] - lead * 60
+                if due_ts > now:
+                    heapq.heappush(self._heap, (due_ts, session['calendly_event_id'], lead, session['scheduled_ts']))
+            if self._heap and self._heap[0][0] != earliest:
+                self._condition.notify()
+
+    def start(self):
+        if self._thread:
+            return
+        if not self._handlers:
+            reminder_log.warning("Reminders enabled but no handlers registered - reminders will only be skipped")
+        # Only queue reminders once something will pop them
+        self.index.add_listener(self._on_session_change)
+        # Sessions loaded before the dispatcher started
+        for session in self.index.between(time.time(), float('inf')):
+            self._on_session_change(session, False)
+        self._thread = threading.Thread(target=self._run, name='reminder-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def pending(self):
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.time()):
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                _, calendly_event_id, lead, scheduled_ts = heapq.heappop(self._heap)
+
+            session = self.index.get(calendly_event_id)
+            if not session or session['scheduled_ts'] != scheduled_ts:
+                continue
+            # Don't claim (and so use up) a reminder nobody would send
+            if not self._handlers:
+                reminder_log.debug("No reminder handlers - skipping %s/%s", calendly_event_id, lead)
+                continue
+
+            try:
+                claimed = self._claim(calendly_event_id, lead)
+            except Exception as e:
+                self._retry(calendly_event_id, lead, scheduled_ts, e)
+                continue
+            if claimed:
+                self._dispatch(session, lead)
+
+    def _claim(self, calendly_event_id, lead):
+        """Claim a reminder; False if another worker already has it, raises on other errors"""
+        try:
+            get_supabase_admin().table('booking_reminders').insert({
+                'calendly_event_id': calendly_event_id,
+                'lead_minutes': lead
+            }).execute()
+            return True
+        except Exception as e:
+            if getattr(e, 'code', None) != UNIQUE_VIOLATION:
+                raise
+            reminder_log.debug("Reminder %s/%s already claimed", calendly_event_id, lead)
+            return False
+
+    def _retry(self, calendly_event_id, lead, scheduled_ts, error):
+        due_ts = time.time() + REMINDER_RETRY_SECONDS
+        if due_ts >= scheduled_ts:
+            reminder_log.warning("Giving up on reminder %s/%s: %s", calendly_event_id, lead, error)
+            return
+        reminder_log.warning("Could not claim reminder %s/%s, retrying in %ss: %s", calendly_event_id, lead, REMINDER_RETRY_SECONDS, error)
+        with self._condition:
+            heapq.heappush(self._heap, (due_ts, calendly_event_id, lead, scheduled_ts))
+            self._condition.notify()
+
+    def _dispatch(self, session, lead):
+        reminder_log.info("Session %s for user %s starts in %s minutes", session['calendly_event_id'], session['user_id'], lead)
+        for handler in self._handlers:
+            try:
+                handler(session, lead)
+            except Exception as e:
+                reminder_log.warning("Reminder handler failed for %s: %s", session['calendly_event_id'], e, exc_info=True)
+
+upcoming_sessions = UpcomingSessionsIndex()
+reminder_dispatcher = ReminderDispatcher(upcoming_sessions)
+
+_started = False
+_start_lock = threading.Lock()
+
+def _sync_loop():
+    while True:
+        time.sleep(UPCOMING_SYNC_INTERVAL_SECONDS)
+        try:
+            upcoming_sessions.sync()
+        except Exception as e:
+            upcoming_log.warning("Upcoming sessions sync failed: %s", e)
+
+def start_upcoming_sessions():
+    """Load the index; with REMINDERS_ENABLED also start the sync loop and dispatcher"""
+    global _started
+    with _start_lock:
+        if _started:
+            return upcoming_sessions
+        add_booking_event_listener(upcoming_sessions.apply_event)
+        upcoming_sessions.load()
+        if REMINDERS_ENABLED:
+            threading.Thread(target=_sync_loop, name='upcoming-sessions-sync', daemon=True).start()
+            reminder_dispatcher.start()
+        _started = True
+    return upcoming_sessions
+
+def get_upcoming_sessions_index():
+    """The index, caught up with every worker's booking writes"""
+    index = start_upcoming_sessions()
+    if not REMINDERS_ENABLED:
+        # No sync loop - catch up on demand instead
+        index.sync()
+    return index
@@ -0,0 +1,45 @@
+import os
+from utils.cache import TieredCache
+from utils.supabase_client import get_supabase_admin
+
+# Email -> users.id lookups are served from the indexed `users.email` column
+# (see sql/001_users_email_index.sql) and cached per host.
+USER_LOOKUP_TTL_SECONDS = int(os.getenv('USER_LOOKUP_TTL_SECONDS', '300'))
+USER_LOOKUP_MAX_ENTRIES = int(os.getenv('USER_LOOKUP_MAX_ENTRIES', '10000'))
+
+user_email_cache = TieredCache('user_email', USER_LOOKUP_TTL_SECONDS, max_entries=USER_LOOKUP_MAX_ENTRIES)
+
+def normalize_email(email):
+    """Normalize an email address for storage and lookups"""
+    if not email:
+        return None
+    normalized = email.strip().lower()
+    return normalized or None
+
+def remember_user_email(email, user_id):
+    """Prime the lookup cache with a known email -> user id mapping"""
+    key = normalize_email(email)
+    if not key or not user_id:
+        return
+
+    user_email_cache.set(key, user_id)
+
+def get_user_id_by_email(email):
+    """Return the users.id for an email (case-insensitive), or None if no profile exists"""
+    key = normalize_email(email)
+    if not key:
+        return None
+
+    user_id = user_email_cache.get(key)
+    if user_id:
+        return user_id
+
+    # Only positive results are cached so a user who registers right after
+    # a miss is found on the next lookup.
+    result = get_supabase_admin().table('users').select('id').eq('email', key).limit(1).execute()
+    if not result.data:
+        return None
+
+    user_id = result.data[0]['id']
+    remember_user_email(key, user_id)
+    return user_id
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from utils.cache import TieredCache
+from utils.supabase_client import get_supabase_admin
+
+# Calendly retries deliveries until it gets a 2xx. Processed deliveries are
+# remembered in the host-wide cache (bounded in-memory LRU + shared tier) in
+# front of the `webhook_deliveries` table (see sql/002_webhook_deliveries.sql)
+# so retries are acknowledged without touching Supabase, whichever worker
+# receives them.
+WEBHOOK_DEDUP_TTL_SECONDS = int(os.getenv('WEBHOOK_DEDUP_TTL_SECONDS', str(7 * 24 * 3600)))
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.getenv('WEBHOOK_DEDUP_MAX_ENTRIES', '5000'))
+WEBHOOK_DEDUP_PURGE_EVERY = 100
+
+def delivery_key(event_type, data, raw_body=b''):
+    """Build the deduplication key for a Calendly delivery (event type + invitee URI)"""
+    payload = data.get('payload', {}) or {}
+    invitee = payload.get('invitee') or payload
+    invitee_uri = invitee.get('uri') if isinstance(invitee, dict) else None
+
+    if invitee_uri:
+        return f"{event_type}:{invitee_uri}"
+
+    # No stable identifier in the payload, fall back to the body itself
+    return f"{event_type}:sha256:{hashlib.sha256(raw_body).hexdigest()}"
+
+class DeliveryStore:
+    """Cache of processed webhook deliveries backed by a TTL'd table"""
+
+    def __init__(self, table='webhook_deliveries', ttl_seconds=WEBHOOK_DEDUP_TTL_SECONDS, max_entries=WEBHOOK_DEDUP_MAX_ENTRIES):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache = TieredCache(table, ttl_seconds, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._marks_since_purge = 0
+        self.cache_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def is_duplicate(self, key):
+        """Return True if the delivery was already processed"""
+        if self._cache.get(key):
+            with self._lock:
+                self.cache_hits += 1
+            return True
+
+        admin_supabase = get_supabase_admin()
+
+        now = datetime.now(timezone.utc)
+        result = admin_supabase.table(self.table).select('expires_at').eq('delivery_key', key).gt('expires_at', now.isoformat()).limit(1).execute()
+
+        if result.data:
+            expires_at = datetime.fromisoformat(result.data[0]['expires_at'])
+            self._cache.set(key, True, ttl_seconds=max((expires_at - now).total_seconds(), 0))
+            with self._lock:
+                self.store_hits += 1
+            return True
+
+        with self._lock:
+            self.misses += 1
+        return False
+
+    def mark_processed(self, key, event_type):
+        """Record a delivery as processed in the cache and in the table"""
+        self._cache.set(key, True)
+
+        admin_supabase = get_supabase_admin()
+
+        now = datetime.now(timezone.utc)
+        admin_supabase.table(self.table).upsert({
+            'delivery_key': key,
+            'event_type': event_type,
+            'received_at': now.isoformat(),
+            'expires_at': (now + timedelta(seconds=self.ttl_seconds)).isoformat()
+        }, on_conflict='delivery_key').execute()
+
+        with self._lock:
+            self._marks_since_purge += 1
+            should_purge = self._marks_since_purge >= WEBHOOK_DEDUP_PURGE_EVERY
+            if should_purge:
+                self._marks_since_purge = 0
+
+        if should_purge:
+            admin_supabase.table(self.table).delete().lt('expires_at', now.isoformat()).execute()
+
+    def stats(self):
+        """Return hit/miss counters for the store"""
+        with self._lock:
+            return {
+                'cache_hits': self.cache_hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses
+            }
+
+delivery_store = DeliveryStore()